@@ -1,34 +1,48 @@
 from __future__ import annotations
 
 import datetime as _dt
+import gzip
 import json
+import logging
 import os
 import re
+import threading
 import time
 import uuid
-import urllib.error
-import urllib.parse
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from urllib.parse import quote
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from importlib import resources
 
+import httpx
 from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, StreamingResponse, HTMLResponse, FileResponse
 from fastapi.encoders import jsonable_encoder
-from pydantic import BaseModel
+from google.auth.transport.requests import Request as GoogleAuthRequest
+from pydantic import BaseModel, field_validator
 from google.oauth2.credentials import Credentials as OAuthCredentials
 import asyncio
 from typing import AsyncIterator
 
-from .backend import PythonChatBackend
+from .backend import PythonChatBackend, aclose_shared_llm_client
 from .logging_config import get_logger
 from .memory import ConversationStore
 from .models import ChatRequest, ChatResponse
 from .service import ChatService
 from .sheets_client import ServiceAccountSheetsClient
+from .utils import column_to_letter, dump_json_bytes, load_json
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    _HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - falls back to pooled HTTP/1.1
+    _HTTP2_AVAILABLE = False
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -80,12 +94,70 @@ SUPABASE_SERVICE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
 Color = Dict[str, float]
 WHITE: Color = {"red": 1.0, "green": 1.0, "blue": 1.0}
 
-# * Lazy initialization - only create when chat endpoint is called
+# Spreadsheet URL components
+_SPREADSHEET_ID_RE = re.compile(r"/spreadsheets/d/([a-zA-Z0-9-_]+)")
+_GID_RE = re.compile(r"[?&]gid=(\d+)")
+
+# Max requests per spreadsheets.batchUpdate call when restoring large snapshots
+_BATCH_UPDATE_CHUNK_SIZE = 500
+
+# Ranges per spreadsheets.get when snapshotting colors (keeps URLs short)
+_COLOR_FETCH_RANGES_PER_REQUEST = 100
+
+# Longest cell list pushed into a PostgREST in.() filter (keeps URLs short)
+_MAX_SERVER_SIDE_CELL_FILTER = 100
+
+# Sheets REST endpoint used with the pooled authorized session
+_SHEETS_API_BASE = "https://sheets.googleapis.com/v4/spreadsheets"
+_SHEETS_API_TIMEOUT_SECONDS = 60
+
+# Supabase insert bodies larger than this are gzip-compressed
+_GZIP_MIN_BYTES = 1024
+
+# Snapshot inserts are split into chunks of this many rows, posted concurrently
+_SUPABASE_INSERT_CHUNK_SIZE = 1000
+_SUPABASE_INSERT_CONCURRENCY = 8
+
+# Spreadsheet metadata cache (sheet ids/titles rarely change between tool calls)
+_SPREADSHEET_CACHE_TTL_SECONDS = 60.0
+_SPREADSHEET_CACHE_MAX_ENTRIES = 256
+
+# Paths polled by docs UIs and health probes; not worth request logging.
+_SKIP_LOG_PATHS = frozenset({"/docs", "/openapi.json", "/redoc", "/health", "/healthz"})
+
+# * Built at startup by lifespan(); falls back to lazy creation if that fails
 store = None
 backend = None
 service = None
+_chat_service_lock = threading.Lock()
 
-app = FastAPI(title="Sheet Mangler Chat API (Python Frontend)")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Build the chat service at startup and close pooled HTTP clients on shutdown."""
+    global _supabase_http, _sheets_http
+
+    try:
+        await asyncio.to_thread(_init_chat_service)
+        logger.info("Chat service initialized at startup")
+    except Exception as exc:
+        # Tool-only deployments may lack LLM config; /chat retries on first use
+        logger.warning(f"Chat service not initialized at startup: {exc}")
+
+    yield
+
+    await aclose_shared_llm_client()
+    # Let queued snapshot uploads finish before their HTTP client goes away
+    _supabase_upload_pool.shutdown(wait=True)
+    if _supabase_http is not None:
+        _supabase_http.close()
+        _supabase_http = None
+    if _sheets_http is not None:
+        _sheets_http.close()
+        _sheets_http = None
+
+
+app = FastAPI(title="Sheet Mangler Chat API (Python Frontend)", lifespan=lifespan)
 
 default_allowed_origins = [
     "http://localhost:5173",
@@ -109,6 +181,18 @@ app.add_middleware(
 )
 
 _sheets_service = None
+_sheets_service_lock = threading.Lock()
+_supabase_http: Optional[httpx.Client] = None
+_supabase_http_lock = threading.Lock()
+_supabase_gzip_uploads = True  # cleared if the server rejects gzip request bodies
+_supabase_upload_pool = ThreadPoolExecutor(
+    max_workers=_SUPABASE_INSERT_CONCURRENCY,
+    thread_name_prefix="supabase-upload",
+)
+_sheets_http: Optional[httpx.Client] = None
+_sheets_http_lock = threading.Lock()
+_spreadsheet_cache: Dict[str, tuple[float, Dict[str, Any]]] = {}
+_spreadsheet_cache_lock = threading.Lock()
 
 
 def _load_app_script_asset(filename: str) -> str:
@@ -163,17 +247,31 @@ def _load_app_script_asset(filename: str) -> str:
 class _SheetsServiceWrapper:
     """Adapter to provide the minimal interface expected by the tool endpoints."""
 
+    __slots__ = ("_client", "service", "credentials")
+
     def __init__(self, client: ServiceAccountSheetsClient) -> None:
         self._client = client
         self.service = client.service
-
-    def fetch_spreadsheet(self, spreadsheet_id: str) -> Dict[str, Any]:
-        return self.service.spreadsheets().get(
-            spreadsheetId=spreadsheet_id,
-        ).execute()
+        self.credentials = client.credentials
 
 
 def _get_sheets_service():
+    """
+    Return the shared Google Sheets API helper, initializing it on first use.
+
+    Credentials are loaded and the API client is built once per process; the
+    lock keeps concurrent first requests from each building their own.
+    """
+    global _sheets_service
+
+    if _sheets_service is None:
+        with _sheets_service_lock:
+            if _sheets_service is None:
+                _sheets_service = _create_sheets_service()
+    return _sheets_service
+
+
+def _create_sheets_service():
     """
     Attempt to initialize a Google Sheets API helper.
 
@@ -181,16 +279,11 @@ def _get_sheets_service():
     Python ServiceAccountSheetsClient so the /tools endpoints still function
     even if the optional tools package is missing.
     """
-    global _sheets_service
-
-    if _sheets_service is not None:
-        return _sheets_service
-
     if GoogleSheetsFormulaValidator is not None and DEFAULT_CREDENTIALS_PATH:
         try:
-            _sheets_service = GoogleSheetsFormulaValidator(DEFAULT_CREDENTIALS_PATH)
+            validator = GoogleSheetsFormulaValidator(DEFAULT_CREDENTIALS_PATH)
             logger.info("Using GoogleSheetsFormulaValidator for sheet tools")
-            return _sheets_service
+            return validator
         except Exception as exc:  # pragma: no cover - defensive logging
             logger.warning(
                 f"Failed to initialize GoogleSheetsFormulaValidator: {exc}",
@@ -200,9 +293,8 @@ def _get_sheets_service():
     try:
         credentials_input = str(DEFAULT_CREDENTIALS_PATH) if DEFAULT_CREDENTIALS_PATH else None
         client = ServiceAccountSheetsClient(credentials_input)
-        _sheets_service = _SheetsServiceWrapper(client)
         logger.info("Falling back to ServiceAccountSheetsClient for sheet tools")
-        return _sheets_service
+        return _SheetsServiceWrapper(client)
     except Exception as exc:
         logger.error(
             f"Unable to initialize any Google Sheets client: {exc}",
@@ -211,6 +303,199 @@ def _get_sheets_service():
         return None
 
 
+class _GoogleBearerAuth(httpx.Auth):
+    """Attach a google-auth access token, refreshing it when expired or rejected."""
+
+    def __init__(self, credentials: Any) -> None:
+        self._credentials = credentials
+        self._lock = threading.Lock()
+
+    def _token(self, force_refresh: bool = False) -> str:
+        with self._lock:
+            if force_refresh or not self._credentials.valid:
+                self._credentials.refresh(GoogleAuthRequest())
+            return self._credentials.token
+
+    def auth_flow(self, request: httpx.Request):
+        request.headers["Authorization"] = f"Bearer {self._token()}"
+        response = yield request
+        if response.status_code == 401:
+            request.headers["Authorization"] = f"Bearer {self._token(force_refresh=True)}"
+            yield request
+
+
+def _get_sheets_http(validator: Any) -> httpx.Client:
+    """
+    Return the shared HTTP client for the Sheets REST API.
+
+    Calls go straight to the JSON endpoints instead of through the discovery
+    client. With HTTP/2, concurrent requests from worker threads (e.g. restore
+    chunks) multiplex over one TLS connection to googleapis.com.
+    """
+    global _sheets_http
+
+    if _sheets_http is None:
+        with _sheets_http_lock:
+            if _sheets_http is None:
+                _sheets_http = httpx.Client(
+                    auth=_GoogleBearerAuth(validator.credentials),
+                    http2=_HTTP2_AVAILABLE,
+                    timeout=_SHEETS_API_TIMEOUT_SECONDS,
+                    limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+                )
+    return _sheets_http
+
+
+def _sheets_request(
+    validator: Any,
+    method: str,
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    body: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Call the Sheets REST API at {_SHEETS_API_BASE}/{path} and return the JSON body.
+
+    Raises RuntimeError with the API's error payload on a non-2xx response.
+    """
+    response = _get_sheets_http(validator).request(
+        method,
+        f"{_SHEETS_API_BASE}/{path}",
+        params=params,
+        content=dump_json_bytes(body) if body is not None else None,
+        headers={"Content-Type": "application/json"} if body is not None else None,
+    )
+    if response.is_error:
+        raise RuntimeError(
+            f"Sheets API {method} {path} failed: {response.status_code} {response.text[:500]}"
+        )
+    return load_json(response.content) if response.content else {}
+
+
+@lru_cache(maxsize=256)
+def _parse_spreadsheet_ref(spreadsheet_url: str) -> Tuple[Optional[str], Optional[int]]:
+    """Extract (spreadsheet_id, gid) from a Sheets URL; either is None if absent.
+
+    Cached because tool calls keep passing the same (often default) URL.
+    """
+    url_id_match = _SPREADSHEET_ID_RE.search(spreadsheet_url)
+    url_gid_match = _GID_RE.search(spreadsheet_url)
+    return (
+        url_id_match.group(1) if url_id_match else None,
+        int(url_gid_match.group(1)) if url_gid_match else None,
+    )
+
+
+def _cached_fetch_spreadsheet(
+    validator: Any,
+    spreadsheet_id: str,
+    refresh: bool = False,
+) -> Dict[str, Any]:
+    """
+    Fetch spreadsheet metadata, reusing a recent result for the same id.
+
+    Entries expire after _SPREADSHEET_CACHE_TTL_SECONDS. Pass refresh=True to
+    bypass the cache, e.g. when a sheet lookup misses because the cached
+    metadata predates a new or renamed sheet. Safe to call from worker threads.
+    """
+    now = time.monotonic()
+    if not refresh:
+        with _spreadsheet_cache_lock:
+            entry = _spreadsheet_cache.get(spreadsheet_id)
+        if entry is not None and now - entry[0] < _SPREADSHEET_CACHE_TTL_SECONDS:
+            return entry[1]
+
+    spreadsheet = _sheets_request(validator, "GET", spreadsheet_id)
+
+    with _spreadsheet_cache_lock:
+        if len(_spreadsheet_cache) >= _SPREADSHEET_CACHE_MAX_ENTRIES:
+            # Evict the oldest entry (dicts preserve insertion order)
+            _spreadsheet_cache.pop(next(iter(_spreadsheet_cache)), None)
+        _spreadsheet_cache.pop(spreadsheet_id, None)
+        _spreadsheet_cache[spreadsheet_id] = (now, spreadsheet)
+    return spreadsheet
+
+
+def _get_supabase_http() -> httpx.Client:
+    """
+    Return the shared HTTP client for Supabase REST calls.
+
+    Reusing one client keeps TCP/TLS connections alive across requests instead
+    of paying a fresh handshake for every snapshot read or write. Callers must
+    check SUPABASE_URL/SUPABASE_SERVICE_KEY before calling.
+    """
+    global _supabase_http
+
+    if _supabase_http is None:
+        with _supabase_http_lock:
+            if _supabase_http is None:
+                _supabase_http = httpx.Client(
+                    base_url=f"{SUPABASE_URL.rstrip('/')}/rest/v1",
+                    headers={
+                        "apikey": SUPABASE_SERVICE_KEY,
+                        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+                        "Accept": "application/json",
+                        # PostgREST compresses large snapshot reads; httpx decodes transparently
+                        "Accept-Encoding": "gzip, deflate",
+                    },
+                    timeout=30.0,
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=4),
+                )
+    return _supabase_http
+
+
+def _post_supabase_rows(path: str, rows: List[Dict[str, Any]]) -> httpx.Response:
+    """
+    POST rows to a Supabase table, gzip-compressing large bodies.
+
+    If a compressed body is rejected but the same rows succeed uncompressed,
+    compression is disabled for the rest of the process.
+    """
+    global _supabase_gzip_uploads
+
+    body = dump_json_bytes(rows)
+    headers = {
+        "Content-Type": "application/json",
+        # Callers ignore the inserted rows, so skip echoing them back
+        "Prefer": "resolution=merge-duplicates,return=minimal",
+    }
+
+    if _supabase_gzip_uploads and len(body) > _GZIP_MIN_BYTES:
+        response = _get_supabase_http().post(
+            path,
+            content=gzip.compress(body, compresslevel=1),
+            headers={**headers, "Content-Encoding": "gzip"},
+        )
+        if response.status_code not in (400, 415):
+            return response
+
+        # Either the body was invalid or gzip is unsupported; resend to find out
+        response = _get_supabase_http().post(path, content=body, headers=headers)
+        if not response.is_error:
+            logger.warning("Supabase rejected gzip request body; sending uploads uncompressed")
+            _supabase_gzip_uploads = False
+        return response
+
+    return _get_supabase_http().post(path, content=body, headers=headers)
+
+
+def _post_supabase_batches(path: str, rows: List[Dict[str, Any]]) -> List[httpx.Response]:
+    """
+    POST rows in chunks of _SUPABASE_INSERT_CHUNK_SIZE, concurrently.
+
+    Keeps each request well under Supabase's body size limit and overlaps the
+    round trips of large snapshots. Responses are returned in chunk order.
+    """
+    if len(rows) <= _SUPABASE_INSERT_CHUNK_SIZE:
+        return [_post_supabase_rows(path, rows)]
+
+    chunks = [
+        rows[i:i + _SUPABASE_INSERT_CHUNK_SIZE]
+        for i in range(0, len(rows), _SUPABASE_INSERT_CHUNK_SIZE)
+    ]
+    return list(_supabase_upload_pool.map(lambda chunk: _post_supabase_rows(path, chunk), chunks))
+
+
 # * ============================================================================
 # * Request/Response Logging Middleware
 # * ============================================================================
@@ -222,9 +507,12 @@ async def logging_middleware(request: Request, call_next):
     Adds request_id for tracing and logs timing information.
     Robust error handling to prevent middleware crashes.
     """
+    if request.scope.get("path") in _SKIP_LOG_PATHS:
+        return await call_next(request)
+
     # Generate unique request ID for tracing
     request_id = str(uuid.uuid4())[:8]
-    start_time = time.time()
+    start_time = time.perf_counter()
 
     # Safely extract request info
     try:
@@ -260,7 +548,7 @@ async def logging_middleware(request: Request, call_next):
     # Process request and handle errors
     try:
         response = await call_next(request)
-        duration_ms = int((time.time() - start_time) * 1000)
+        duration_ms = int((time.perf_counter() - start_time) * 1000)
 
         # Safely get status code
         try:
@@ -291,13 +579,15 @@ async def logging_middleware(request: Request, call_next):
         return response
 
     except Exception as exc:
-        duration_ms = int((time.time() - start_time) * 1000)
+        duration_ms = int((time.perf_counter() - start_time) * 1000)
 
-        # Log error (with fallback)
+        # Log error (with fallback). The exception is re-raised and the server
+        # logs the traceback, so only serialize it here when debugging.
+        include_traceback = logger.isEnabledFor(logging.DEBUG)
         try:
             logger.error(
                 f"✗ {method} {path} - Exception ({duration_ms}ms)",
-                exc_info=True,
+                exc_info=include_traceback,
                 extra={
                     "request_id": request_id,
                     "method": method,
@@ -308,7 +598,7 @@ async def logging_middleware(request: Request, call_next):
         except Exception:
             # Fallback: simple error log
             try:
-                logger.error(f"✗ {method} {path} - Exception", exc_info=True)
+                logger.error(f"✗ {method} {path} - Exception", exc_info=include_traceback)
             except Exception:
                 pass  # Give up silently
 
@@ -364,12 +654,14 @@ async def get_logo():
 # * ============================================================================
 
 def _init_chat_service() -> ChatService:
-    """Lazily initialize chat service on first use."""
+    """Return the chat service, creating it if startup initialization did not."""
     global store, backend, service
     if service is None:
-        store = ConversationStore()
-        backend = PythonChatBackend()
-        service = ChatService(backend=backend, store=store)
+        with _chat_service_lock:
+            if service is None:
+                store = ConversationStore()
+                backend = PythonChatBackend()
+                service = ChatService(backend=backend, store=store)
     return service
 
 
@@ -389,6 +681,9 @@ class RestoreRequest(BaseModel):
     """Request to restore colors from Supabase snapshot."""
     snapshot_batch_id: str
     cell_locations: Optional[List[str]] = None
+    # Optional: when both are given, /tools/restore fetches sheet metadata alongside the snapshot
+    spreadsheet_id: Optional[str] = None
+    gid: Optional[int] = None
 
 
 class CellUpdate(BaseModel):
@@ -446,7 +741,8 @@ async def chat(request: ChatRequest) -> ChatResponse:
   # directly or adapt this endpoint accordingly.
   try:
       svc = _init_chat_service()
-      response = svc.chat(request)
+      # The orchestrator makes blocking LLM and Sheets calls; keep them off the event loop
+      response = await asyncio.to_thread(svc.chat, request)
       logger.info(
           f"Chat response: {len(response.messages)} message(s), session={response.sessionId}",
           extra={
@@ -474,7 +770,7 @@ async def stream_chat_response(request: ChatRequest) -> AsyncIterator[str]:
 
         # For now, we'll simulate streaming by breaking the response into chunks
         # In a real implementation, this would stream from the LLM
-        response = svc.chat(request)
+        response = await asyncio.to_thread(svc.chat, request)
 
         # Stream the session ID first
         yield f"data: {json.dumps({'type': 'session', 'sessionId': response.sessionId})}\n\n"
@@ -599,7 +895,7 @@ async def visualize_formulas_endpoint(
         )
 
     try:
-        result = visualize_formulas(sheet_url)
+        result = await asyncio.to_thread(visualize_formulas, sheet_url)
         logger.info(
             "Visualize formulas completed",
             extra={
@@ -623,21 +919,31 @@ async def visualize_formulas_endpoint(
 # * Color Tool Endpoints
 # * ============================================================================
 
+_HEX_COLOR_RE = re.compile(r"#?[0-9A-Fa-f]{6}")
+_COLUMN_LABEL_RE = re.compile(r"[A-Z]+")
+_ROW_NUMBER_RE = re.compile(r"\d+")
+_CELL_REF_RE = re.compile(r"([A-Z]+)(\d+)")
+
+
+@lru_cache(maxsize=1024)
 def _hex_color_to_rgb(value: str) -> Color:
-    """Convert hex color to RGB (0-1 range)."""
-    match = re.fullmatch(r"#?([0-9A-Fa-f]{6})", value)
-    if not match:
+    """Convert hex color to RGB (0-1 range).
+
+    Cached: callers must treat the returned dict as read-only.
+    """
+    if not _HEX_COLOR_RE.fullmatch(value):
         raise ValueError(f"Invalid hex color '{value}'.")
-    hex_value = match.group(1)
-    red = int(hex_value[0:2], 16) / 255.0
-    green = int(hex_value[2:4], 16) / 255.0
-    blue = int(hex_value[4:6], 16) / 255.0
-    return {"red": red, "green": green, "blue": blue}
+    packed = int(value[-6:], 16)
+    return {
+        "red": ((packed >> 16) & 0xFF) / 255.0,
+        "green": ((packed >> 8) & 0xFF) / 255.0,
+        "blue": (packed & 0xFF) / 255.0,
+    }
 
 
 def _column_to_index(label: str) -> int:
     """Convert column letter to index."""
-    if not re.fullmatch(r"[A-Z]+", label):
+    if not _COLUMN_LABEL_RE.fullmatch(label):
         raise ValueError(f"Invalid column label '{label}'.")
     index = 0
     for char in label:
@@ -645,6 +951,7 @@ def _column_to_index(label: str) -> int:
     return index - 1
 
 
+@lru_cache(maxsize=8192)
 def _parse_cell(cell: str) -> tuple[int, int]:
     """Parse cell reference into row and column indices.
 
@@ -654,23 +961,26 @@ def _parse_cell(cell: str) -> tuple[int, int]:
     - Column-only: "A" -> (0, 0)
     """
     # Try standard cell format first (e.g., "A1")
-    match = re.fullmatch(r"([A-Z]+)(\d+)", cell)
+    match = _CELL_REF_RE.fullmatch(cell)
     if match:
-        column = _column_to_index(match.group(1))
+        # The pattern guarantees an uppercase label; no need to re-validate it
+        column = -1
+        for char in match.group(1):
+            column = (column + 1) * 26 + (ord(char) - 65)
         row = int(match.group(2)) - 1
         if row < 0:
             raise ValueError(f"Row index must be positive in '{cell}'.")
         return row, column
 
     # Try row-only format (e.g., "2")
-    if re.fullmatch(r"\d+", cell):
+    if _ROW_NUMBER_RE.fullmatch(cell):
         row = int(cell) - 1
         if row < 0:
             raise ValueError(f"Row index must be positive in '{cell}'.")
         return row, 0  # Column 0 as placeholder
 
     # Try column-only format (e.g., "A")
-    if re.fullmatch(r"[A-Z]+", cell):
+    if _COLUMN_LABEL_RE.fullmatch(cell):
         column = _column_to_index(cell)
         return 0, column  # Row 0 as placeholder
 
@@ -693,7 +1003,7 @@ def _range_to_bounds(range_ref: str) -> tuple[int, int, int, int]:
         cell = parts[0]
 
         # Check if it's a whole row (just a number)
-        if re.fullmatch(r"\d+", cell):
+        if _ROW_NUMBER_RE.fullmatch(cell):
             row = int(cell) - 1
             if row < 0:
                 raise ValueError(f"Row index must be positive in '{cell}'.")
@@ -701,7 +1011,7 @@ def _range_to_bounds(range_ref: str) -> tuple[int, int, int, int]:
             return row, row + 1, 0, 26
 
         # Check if it's a whole column (just letters)
-        if re.fullmatch(r"[A-Z]+", cell):
+        if _COLUMN_LABEL_RE.fullmatch(cell):
             col = _column_to_index(cell)
             # Whole column: rows 0 to 1000 - use reasonable limit
             return 0, 1000, col, col + 1
@@ -715,7 +1025,7 @@ def _range_to_bounds(range_ref: str) -> tuple[int, int, int, int]:
         start, end = parts
 
         # Check if it's a row range (e.g., "2:5")
-        if re.fullmatch(r"\d+", start) and re.fullmatch(r"\d+", end):
+        if _ROW_NUMBER_RE.fullmatch(start) and _ROW_NUMBER_RE.fullmatch(end):
             start_row = int(start) - 1
             end_row = int(end) - 1
             if start_row < 0 or end_row < 0:
@@ -726,7 +1036,7 @@ def _range_to_bounds(range_ref: str) -> tuple[int, int, int, int]:
             return start_row, end_row + 1, 0, 26
 
         # Check if it's a column range (e.g., "A:C")
-        if re.fullmatch(r"[A-Z]+", start) and re.fullmatch(r"[A-Z]+", end):
+        if _COLUMN_LABEL_RE.fullmatch(start) and _COLUMN_LABEL_RE.fullmatch(end):
             start_col = _column_to_index(start)
             end_col = _column_to_index(end)
             if end_col < start_col:
@@ -759,6 +1069,27 @@ def _resolve_sheet(spreadsheet: Dict[str, Any], gid: Optional[int]) -> Dict[str,
     raise ValueError(f"No sheet found with gid={gid}.")
 
 
+def _resolve_sheet_fresh(
+    validator: Any,
+    spreadsheet_id: str,
+    gid: Optional[int],
+    spreadsheet: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Resolve a sheet from cached metadata, re-fetching once if it is missing.
+
+    Pass spreadsheet to start from metadata the caller already holds. Raises
+    ValueError if the sheet is not found even in fresh metadata.
+    """
+    if spreadsheet is None:
+        spreadsheet = _cached_fetch_spreadsheet(validator, spreadsheet_id)
+    try:
+        return _resolve_sheet(spreadsheet, gid)
+    except ValueError:
+        # Cached metadata may predate the sheet; retry against fresh metadata
+        spreadsheet = _cached_fetch_spreadsheet(validator, spreadsheet_id, refresh=True)
+        return _resolve_sheet(spreadsheet, gid)
+
+
 def _build_color_request(sheet_id: int, cell_location: str, color: Color, note: str) -> Dict[str, Any]:
     """Build batch update request for cell coloring."""
     start_row, end_row, start_col, end_col = _range_to_bounds(cell_location)
@@ -818,20 +1149,14 @@ async def apply_colors(requests: List[ColorRequest]) -> Dict[str, Any]:
         spreadsheet_url = requests[0].url
         logger.info(f"Using spreadsheet URL from request: {spreadsheet_url}")
 
-        url_id_match = re.search(r"/spreadsheets/d/([a-zA-Z0-9-_]+)", spreadsheet_url)
-        url_gid_match = re.search(r"[?&]gid=(\d+)", spreadsheet_url)
-
-        if not url_id_match:
+        spreadsheet_id, gid = _parse_spreadsheet_ref(spreadsheet_url)
+        if not spreadsheet_id:
             logger.error(f"Invalid spreadsheet URL format: {spreadsheet_url}")
             raise ValueError(f"Invalid spreadsheet URL format: {spreadsheet_url}")
 
-        spreadsheet_id = url_id_match.group(1)
-        gid = int(url_gid_match.group(1)) if url_gid_match else None
-
         logger.info(f"Extracted spreadsheet_id: {spreadsheet_id}, gid: {gid}")
 
-        spreadsheet = validator.fetch_spreadsheet(spreadsheet_id)
-        sheet = _resolve_sheet(spreadsheet, gid)
+        sheet = await asyncio.to_thread(_resolve_sheet_fresh, validator, spreadsheet_id, gid)
         sheet_props = sheet["properties"]
         sheet_title = sheet_props["title"]
 
@@ -840,60 +1165,82 @@ async def apply_colors(requests: List[ColorRequest]) -> Dict[str, Any]:
         snapshot_batch_id = str(uuid.uuid4())
         logger.info(f"[COLOR] Creating snapshot with batch_id: {snapshot_batch_id}")
 
-        cell_ranges = list(set(req.cell_location for req in requests))
-        rows_to_insert: List[Dict[str, Any]] = []
-
-        for range_ref in cell_ranges:
-            logger.debug(f"[COLOR] Fetching colors for range: {range_ref}")
-            colors_by_cell = _fetch_colors_for_range(validator, spreadsheet_id, sheet_title, range_ref)
-            expanded_cells = _expand_range(range_ref)
-            logger.debug(f"[COLOR] Range '{range_ref}' expanded to {len(expanded_cells)} cell(s)")
-
-            for cell in expanded_cells:
-                color = colors_by_cell.get(cell, WHITE)
-                rows_to_insert.append(
-                    {
-                        "snapshot_batch_id": snapshot_batch_id,  # Same ID for ALL cells
-                        "spreadsheet_id": spreadsheet_id,
-                        "gid": gid,
-                        "cell": cell,
-                        "red": float(color["red"]),
-                        "green": float(color["green"]),
-                        "blue": float(color["blue"]),
-                    }
-                )
+        # De-duplicate while keeping request order so snapshot rows are deterministic
+        cell_ranges = list(dict.fromkeys(req.cell_location for req in requests))
+
+        # One spreadsheets.get per group of ranges; groups are fetched concurrently
+        logger.debug(f"[COLOR] Fetching colors for {len(cell_ranges)} range(s)")
+        range_groups = [
+            cell_ranges[i:i + _COLOR_FETCH_RANGES_PER_REQUEST]
+            for i in range(0, len(cell_ranges), _COLOR_FETCH_RANGES_PER_REQUEST)
+        ]
+        colors_by_range: Dict[str, Dict[str, Color]] = {}
+        for group_colors in await asyncio.gather(*(
+            asyncio.to_thread(_fetch_colors_for_ranges, validator, spreadsheet_id, sheet_title, group)
+            for group in range_groups
+        )):
+            colors_by_range.update(group_colors)
+
+        # Colors from _normalize_color (and WHITE) are already floats; use them as-is
+        rows_to_insert: List[Dict[str, Any]] = [
+            {
+                "snapshot_batch_id": snapshot_batch_id,  # Same ID for ALL cells
+                "spreadsheet_id": spreadsheet_id,
+                "gid": gid,
+                "cell": cell,
+                "red": color["red"],
+                "green": color["green"],
+                "blue": color["blue"],
+            }
+            for range_ref in cell_ranges
+            for cell in _expand_range(range_ref)
+            for color in (colors_by_range[range_ref].get(cell, WHITE),)
+        ]
 
         logger.info(f"[COLOR] Snapshotting {len(rows_to_insert)} cell(s) to Supabase")
 
         if rows_to_insert:
-            _post_to_supabase(rows_to_insert)
+            await asyncio.to_thread(_post_to_supabase, rows_to_insert)
             logger.info(f"[COLOR] ✓ Snapshot created with {len(rows_to_insert)} cell(s)")
 
-        # Return the snapshot batch ID for restore
-        first_snapshot_batch_id = snapshot_batch_id
-
         # * STEP 2: Apply the new colors
+        # Drop repeated (range, color, note) requests. Keeping the last copy
+        # preserves the final state when a range is recolored and then set back.
+        unique_requests: Dict[Tuple[str, str, str], ColorRequest] = {}
+        for req in requests:
+            key = (req.cell_location, req.color.lower(), req.message)
+            unique_requests.pop(key, None)
+            unique_requests[key] = req
+
+        # Parse each distinct hex color once; batches usually share a few colors.
+        rgb_by_hex = {
+            hex_color: _hex_color_to_rgb(hex_color)
+            for hex_color in {req.color for req in unique_requests.values()}
+        }
         batch_requests = [
-            _build_color_request(sheet_props["sheetId"], req.cell_location, _hex_color_to_rgb(req.color), req.message)
-            for req in requests
+            _build_color_request(sheet_props["sheetId"], req.cell_location, rgb_by_hex[req.color], req.message)
+            for req in unique_requests.values()
         ]
 
         logger.info(f"Applying colors to {len(batch_requests)} range(s)")
-        validator.service.spreadsheets().batchUpdate(
-            spreadsheetId=spreadsheet_id,
+        await asyncio.to_thread(
+            _sheets_request,
+            validator,
+            "POST",
+            f"{spreadsheet_id}:batchUpdate",
             body={"requests": batch_requests},
-        ).execute()
+        )
 
         logger.info(
             f"Successfully colored {len(batch_requests)} range(s)",
-            extra={"count": len(batch_requests), "snapshot_batch_id": first_snapshot_batch_id}
+            extra={"count": len(batch_requests), "snapshot_batch_id": snapshot_batch_id}
         )
 
         return {
             "status": "success",
             "message": f"Colored {len(batch_requests)} range(s) on '{sheet_props['title']}'.",
             "count": len(batch_requests),
-            "snapshot_batch_id": first_snapshot_batch_id,
+            "snapshot_batch_id": snapshot_batch_id,
         }
     except Exception as e:
         logger.error(f"Color request failed: {str(e)}", exc_info=True)
@@ -906,7 +1253,7 @@ async def apply_colors(requests: List[ColorRequest]) -> Dict[str, Any]:
 
 def _column_index(label: str) -> int:
     """Convert column letter to index."""
-    if not re.fullmatch(r"[A-Z]+", label):
+    if not _COLUMN_LABEL_RE.fullmatch(label):
         raise ValueError(f"Invalid column label '{label}'.")
     index = 0
     for char in label:
@@ -918,12 +1265,7 @@ def _column_label(index: int) -> str:
     """Convert column index to letter."""
     if index < 0:
         raise ValueError(f"Column index must be non-negative: {index}")
-    label = ""
-    while index >= 0:
-        index, remainder = divmod(index, 26)
-        label = chr(65 + remainder) + label
-        index -= 1
-    return label
+    return column_to_letter(index + 1)
 
 
 def _cell_address(row_index: int, col_index: int) -> str:
@@ -947,7 +1289,7 @@ def _range_bounds(range_ref: str) -> tuple[int, int, int, int]:
         cell = parts[0]
 
         # Check if it's a whole row (just a number)
-        if re.fullmatch(r"\d+", cell):
+        if _ROW_NUMBER_RE.fullmatch(cell):
             row = int(cell) - 1
             if row < 0:
                 raise ValueError(f"Row index must be positive in '{cell}'.")
@@ -955,7 +1297,7 @@ def _range_bounds(range_ref: str) -> tuple[int, int, int, int]:
             return row, row, 0, 25
 
         # Check if it's a whole column (just letters)
-        if re.fullmatch(r"[A-Z]+", cell):
+        if _COLUMN_LABEL_RE.fullmatch(cell):
             col = _column_to_index(cell)
             # Whole column: rows 0 to 999 (reasonable limit)
             return 0, 999, col, col
@@ -969,7 +1311,7 @@ def _range_bounds(range_ref: str) -> tuple[int, int, int, int]:
         start, end = parts
 
         # Check if it's a row range (e.g., "2:5")
-        if re.fullmatch(r"\d+", start) and re.fullmatch(r"\d+", end):
+        if _ROW_NUMBER_RE.fullmatch(start) and _ROW_NUMBER_RE.fullmatch(end):
             start_row = int(start) - 1
             end_row = int(end) - 1
             if start_row < 0 or end_row < 0:
@@ -980,7 +1322,7 @@ def _range_bounds(range_ref: str) -> tuple[int, int, int, int]:
             return start_row, end_row, 0, 25
 
         # Check if it's a column range (e.g., "A:C")
-        if re.fullmatch(r"[A-Z]+", start) and re.fullmatch(r"[A-Z]+", end):
+        if _COLUMN_LABEL_RE.fullmatch(start) and _COLUMN_LABEL_RE.fullmatch(end):
             start_col = _column_to_index(start)
             end_col = _column_to_index(end)
             if end_col < start_col:
@@ -999,18 +1341,24 @@ def _range_bounds(range_ref: str) -> tuple[int, int, int, int]:
         raise ValueError(f"Invalid range '{range_ref}'.")
 
 
-def _expand_range(range_ref: str) -> List[str]:
+@lru_cache(maxsize=1024)
+def _expand_range(range_ref: str) -> Tuple[str, ...]:
     """Expand range into individual cell addresses.
 
     WARNING: For whole rows/columns, this can expand to many cells.
     We limit expansion to max 1000 cells to prevent memory issues.
+    Results are cached, hence the immutable tuple.
     """
     start_row, end_row, start_col, end_col = _range_bounds(range_ref)
 
-    # Calculate total cells
-    num_rows = end_row - start_row + 1
-    num_cols = end_col - start_col + 1
-    total_cells = num_rows * num_cols
+    # Label each column once rather than once per cell
+    col_labels = [_column_label(col) for col in range(start_col, end_col + 1)]
+    total_cells = (end_row - start_row + 1) * len(col_labels)
+    cells = (
+        f"{label}{row + 1}"
+        for row in range(start_row, end_row + 1)
+        for label in col_labels
+    )
 
     # Limit expansion to prevent memory issues
     MAX_CELLS = 1000
@@ -1020,28 +1368,23 @@ def _expand_range(range_ref: str) -> List[str]:
         )
         # For large ranges, just return a sample of cells
         # This is mainly for logging/debugging - color API handles ranges natively
-        cells: List[str] = []
-        count = 0
-        for row in range(start_row, end_row + 1):
-            for col in range(start_col, end_col + 1):
-                if count >= MAX_CELLS:
-                    break
-                cells.append(_cell_address(row, col))
-                count += 1
-            if count >= MAX_CELLS:
-                break
-        return cells
+        return tuple(islice(cells, MAX_CELLS))
+
+    return tuple(cells)
 
-    # Normal expansion
-    cells: List[str] = []
-    for row in range(start_row, end_row + 1):
-        for col in range(start_col, end_col + 1):
-            cells.append(_cell_address(row, col))
-    return cells
+
+@lru_cache(maxsize=1024)
+def _interned_color(red: float, green: float, blue: float) -> Color:
+    """Return one shared Color dict per distinct RGB; callers must not mutate it."""
+    return {"red": red, "green": green, "blue": blue}
 
 
 def _normalize_color(cell_data: Optional[Dict[str, Any]]) -> Color:
-    """Extract and normalize color from cell data."""
+    """Extract and normalize color from cell data.
+
+    Sheets tend to reuse a handful of colors, so identical colors share one
+    (read-only) dict instead of allocating one per cell.
+    """
     if not cell_data:
         return WHITE
     fmt = cell_data.get("userEnteredFormat")
@@ -1053,45 +1396,49 @@ def _normalize_color(cell_data: Optional[Dict[str, Any]]) -> Color:
     red = float(color.get("red", 1.0) or 0.0)
     green = float(color.get("green", 1.0) or 0.0)
     blue = float(color.get("blue", 1.0) or 0.0)
-    return {"red": red, "green": green, "blue": blue}
+    return _interned_color(red, green, blue)
 
 
-def _fetch_colors_for_range(
+def _fetch_colors_for_ranges(
     validator: Any,
     spreadsheet_id: str,
     sheet_title: str,
-    range_ref: str,
-) -> Dict[str, Color]:
-    """Fetch colors for a range from Google Sheets."""
-    sheet_range = f"'{sheet_title}'!{range_ref}"
-    response = validator.service.spreadsheets().get(
-        spreadsheetId=spreadsheet_id,
-        ranges=[sheet_range],
-        includeGridData=True,
-        fields="sheets(data(rowData(values(userEnteredFormat.backgroundColor)))),sheets(properties(sheetId,title))",
-    ).execute()
-
-    start_row, end_row, start_col, end_col = _range_bounds(range_ref)
-    colors: Dict[str, Color] = {}
+    range_refs: List[str],
+) -> Dict[str, Dict[str, Color]]:
+    """Fetch colors for several ranges of one sheet with a single spreadsheets.get call."""
+    response = _sheets_request(
+        validator,
+        "GET",
+        spreadsheet_id,
+        params={
+            "ranges": [f"'{sheet_title}'!{range_ref}" for range_ref in range_refs],
+            "includeGridData": "true",
+            "fields": "sheets(data(rowData(values(userEnteredFormat.backgroundColor))))",
+        },
+    )
 
     sheets_data = response.get("sheets", [])
-    if not sheets_data:
-        return colors
-
-    data_blocks = sheets_data[0].get("data", [])
-    if not data_blocks:
-        return colors
+    # One data block per requested range, in request order
+    data_blocks = sheets_data[0].get("data", []) if sheets_data else []
+
+    colors_by_range: Dict[str, Dict[str, Color]] = {}
+    for index, range_ref in enumerate(range_refs):
+        colors: Dict[str, Color] = {}
+        colors_by_range[range_ref] = colors
+        if index >= len(data_blocks):
+            continue
 
-    row_data = data_blocks[0].get("rowData", [])
-    for row_offset, row_entry in enumerate(row_data):
-        values = row_entry.get("values", [])
-        for col_offset, cell_entry in enumerate(values):
-            row_index = start_row + row_offset
-            col_index = start_col + col_offset
-            cell_label = _cell_address(row_index, col_index)
-            colors[cell_label] = _normalize_color(cell_entry)
+        start_row, end_row, start_col, end_col = _range_bounds(range_ref)
+        row_data = data_blocks[index].get("rowData", [])
+        for row_offset, row_entry in enumerate(row_data):
+            values = row_entry.get("values", [])
+            for col_offset, cell_entry in enumerate(values):
+                row_index = start_row + row_offset
+                col_index = start_col + col_offset
+                cell_label = _cell_address(row_index, col_index)
+                colors[cell_label] = _normalize_color(cell_entry)
 
-    return colors
+    return colors_by_range
 
 
 def _post_to_supabase(rows: List[Dict[str, Any]]) -> None:
@@ -1102,26 +1449,11 @@ def _post_to_supabase(rows: List[Dict[str, Any]]) -> None:
     if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
         raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be configured.")
 
-    url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cell_color_snapshots"
-    request = urllib.request.Request(
-        url,
-        method="POST",
-        data=json.dumps(rows).encode("utf-8"),
-        headers={
-            "Content-Type": "application/json",
-            "apikey": SUPABASE_SERVICE_KEY,
-            "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-            "Prefer": "resolution=merge-duplicates",
-        },
-    )
-
-    try:
-        with urllib.request.urlopen(request) as response:
-            if response.status not in (200, 201, 204):
-                raise RuntimeError(f"Unexpected Supabase status: {response.status}")
-    except urllib.error.HTTPError as exc:
-        body = exc.read().decode("utf-8", errors="ignore")
-        raise RuntimeError(f"Supabase insert failed: {exc.status} {body}") from exc
+    for response in _post_supabase_batches("/cell_color_snapshots", rows):
+        if response.is_error:
+            raise RuntimeError(f"Supabase insert failed: {response.status_code} {response.text}")
+        if response.status_code not in (200, 201, 204):
+            raise RuntimeError(f"Unexpected Supabase status: {response.status_code}")
 
 
 # * ============================================================================
@@ -1130,60 +1462,92 @@ def _post_to_supabase(rows: List[Dict[str, Any]]) -> None:
 
 def _fetch_snapshot_rows(
     snapshot_batch_id: str,
-    spreadsheet_id: str,
-    gid: Optional[int],
+    spreadsheet_id: Optional[str] = None,
+    gid: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
-    """Fetch color snapshot rows from Supabase."""
+    """Fetch color snapshot rows from Supabase.
+
+    When spreadsheet_id is omitted, all rows for the batch are returned along
+    with their spreadsheet_id and gid columns (gid is ignored in that case).
+    """
     if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
         raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be configured.")
 
+    if spreadsheet_id is None:
+        params = {
+            "select": "cell,red,green,blue,spreadsheet_id,gid",
+            "snapshot_batch_id": f"eq.{snapshot_batch_id}",
+        }
+    else:
+        params = {
+            "select": "cell,red,green,blue",
+            "snapshot_batch_id": f"eq.{snapshot_batch_id}",
+            "spreadsheet_id": f"eq.{spreadsheet_id}",
+        }
+        if gid is None:
+            params["gid"] = "is.null"
+        else:
+            params["gid"] = f"eq.{gid}"
+    response = _get_supabase_http().get("/cell_color_snapshots", params=params)
+    if response.is_error:
+        raise RuntimeError(f"Supabase fetch failed: {response.status_code} {response.text}")
+    if response.status_code != 200:
+        raise RuntimeError(f"Unexpected Supabase status: {response.status_code}")
+    rows = load_json(response.content)
+    if not isinstance(rows, list):
+        raise RuntimeError("Supabase response malformed; expected a list.")
+    return rows
+
+
+def _fetch_value_snapshot_rows(
+    snapshot_batch_id: str,
+    cells: Optional[List[str]] = None,
+) -> Any:
+    """Fetch cell value snapshot rows from Supabase, optionally only for the given cells."""
     params = {
-        "select": "cell,red,green,blue",
+        "select": "cell,value,spreadsheet_id,gid",
         "snapshot_batch_id": f"eq.{snapshot_batch_id}",
-        "spreadsheet_id": f"eq.{spreadsheet_id}",
     }
-    if gid is None:
-        params["gid"] = "is.null"
-    else:
-        params["gid"] = f"eq.{gid}"
-    query = urllib.parse.urlencode(params, doseq=True)
-    url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cell_color_snapshots?{query}"
-
-    request = urllib.request.Request(
-        url,
-        method="GET",
-        headers={
-            "apikey": SUPABASE_SERVICE_KEY,
-            "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-            "Accept": "application/json",
-        },
+    if cells:
+        params["cell"] = _postgrest_in_filter(cells)
+
+    response = _get_supabase_http().get("/cell_value_snapshots", params=params)
+    if response.is_error:
+        raise RuntimeError(f"Supabase fetch failed: {response.status_code} {response.text}")
+    if response.status_code != 200:
+        raise RuntimeError(f"Supabase error: {response.status_code}")
+    return load_json(response.content)
+
+
+def _postgrest_in_filter(values: List[str]) -> str:
+    """Build a PostgREST in.() filter, quoting values (A1 ranges contain ':')."""
+    quoted = ",".join(
+        '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+        for value in values
     )
+    return f"in.({quoted})"
 
-    try:
-        with urllib.request.urlopen(request) as response:
-            if response.status != 200:
-                raise RuntimeError(f"Unexpected Supabase status: {response.status}")
-            payload = response.read()
-    except urllib.error.HTTPError as exc:
-        body = exc.read().decode("utf-8", errors="ignore")
-        raise RuntimeError(f"Supabase fetch failed: {exc.status} {body}") from exc
-
-    rows = json.loads(payload)
-    if not isinstance(rows, list):
-        raise RuntimeError("Supabase response malformed; expected a list.")
-    return rows
 
+def _build_repeat_cell(
+    sheet_id: int,
+    row: int,
+    col: int,
+    color: Color,
+    row_count: int = 1,
+    col_count: int = 1,
+) -> Dict[str, Any]:
+    """Build batch update request for cell color restoration.
 
-def _build_repeat_cell(sheet_id: int, row: int, col: int, color: Color) -> Dict[str, Any]:
-    """Build batch update request for cell color restoration."""
+    Covers a single cell by default, or a row_count x col_count block.
+    """
     return {
         "repeatCell": {
             "range": {
                 "sheetId": sheet_id,
                 "startRowIndex": row,
-                "endRowIndex": row + 1,
+                "endRowIndex": row + row_count,
                 "startColumnIndex": col,
-                "endColumnIndex": col + 1,
+                "endColumnIndex": col + col_count,
             },
             "cell": {
                 "userEnteredFormat": {
@@ -1200,6 +1564,39 @@ def _build_repeat_cell(sheet_id: int, row: int, col: int, color: Color) -> Dict[
     }
 
 
+def _coalesce_color_cells(
+    colors_by_position: Dict[Tuple[int, int], Tuple[float, float, float]],
+) -> List[Tuple[int, int, int, int, Tuple[float, float, float]]]:
+    """Merge same-colored cells into rectangles.
+
+    Cells are first joined into runs of consecutive columns within a row; runs
+    with the same columns and color on consecutive rows are then stacked.
+    Returns (row, col, row_count, col_count, rgb) tuples covering every cell once.
+    """
+    runs: List[List[Any]] = []  # [row, start_col, end_col, rgb]
+    for (row, col), rgb in sorted(colors_by_position.items()):
+        if runs:
+            last = runs[-1]
+            if last[0] == row and last[2] + 1 == col and last[3] == rgb:
+                last[2] = col
+                continue
+        runs.append([row, col, col, rgb])
+
+    rects: List[List[Any]] = []  # [row, col, row_count, col_count, rgb]
+    open_rects: Dict[Tuple[int, int, Tuple[float, float, float]], List[Any]] = {}
+    for row, start_col, end_col, rgb in runs:
+        key = (start_col, end_col, rgb)
+        rect = open_rects.get(key)
+        if rect is not None and rect[0] + rect[2] == row:
+            rect[2] += 1
+            continue
+        rect = [row, start_col, 1, end_col - start_col + 1, rgb]
+        rects.append(rect)
+        open_rects[key] = rect
+
+    return [tuple(rect) for rect in rects]  # type: ignore[misc]
+
+
 @app.post("/tools/restore")
 async def restore_colors(request: RestoreRequest) -> Dict[str, Any]:
     """
@@ -1227,142 +1624,136 @@ async def restore_colors(request: RestoreRequest) -> Dict[str, Any]:
             logger.error("[RESTORE] Missing snapshot_batch_id")
             raise HTTPException(status_code=400, detail="Missing snapshot_batch_id")
 
-        expected_cells = None
+        expected_cells: Optional[frozenset[str]] = None
         if request.cell_locations:
-            expected_cells = set()
+            requested_cells: set[str] = set()
             for range_ref in request.cell_locations:
                 try:
                     cells = _expand_range(range_ref)
-                    expected_cells.update(cells)
+                    requested_cells.update(cells)
                     logger.debug(f"[RESTORE] Expanded range '{range_ref}' to {len(cells)} cell(s)")
                 except Exception as exc:
                     logger.warning(f"[RESTORE] Failed to expand range '{range_ref}': {exc}")
                     # Continue with other ranges
+            expected_cells = frozenset(requested_cells)
 
-        # First, fetch snapshot rows to get spreadsheet_id and gid from the snapshot data
-        logger.info(f"[RESTORE] Fetching snapshot for batch_id: {snapshot_batch_id}")
-
-        # We need to fetch without filtering by spreadsheet_id/gid first
         if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
             logger.error("[RESTORE] Supabase not configured")
             raise HTTPException(status_code=500, detail="Supabase not configured")
 
-        params = {
-            "select": "cell,red,green,blue,spreadsheet_id,gid",
-            "snapshot_batch_id": f"eq.{snapshot_batch_id}",
-            "limit": "1",  # Just get one row to extract spreadsheet_id and gid
-        }
-        query = urllib.parse.urlencode(params, doseq=True)
-        url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cell_color_snapshots?{query}"
-
-        req = urllib.request.Request(
-            url,
-            method="GET",
-            headers={
-                "apikey": SUPABASE_SERVICE_KEY,
-                "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-                "Accept": "application/json",
-            },
-        )
+        spreadsheet: Optional[Dict[str, Any]] = None
+        if request.spreadsheet_id and request.gid is not None:
+            # Caller knows the sheet: fetch the filtered rows and the metadata together
+            spreadsheet_id = request.spreadsheet_id
+            gid = request.gid
+            logger.info(
+                f"[RESTORE] Fetching snapshot for batch_id: {snapshot_batch_id} "
+                f"(spreadsheet_id={spreadsheet_id}, gid={gid})"
+            )
+            rows_result, spreadsheet_result = await asyncio.gather(
+                asyncio.to_thread(_fetch_snapshot_rows, snapshot_batch_id, spreadsheet_id, gid),
+                asyncio.to_thread(_cached_fetch_spreadsheet, validator, spreadsheet_id),
+                return_exceptions=True,
+            )
+            if isinstance(rows_result, BaseException):
+                logger.error(f"[RESTORE] Failed to fetch snapshot rows: {rows_result}", exc_info=rows_result)
+                raise HTTPException(status_code=500, detail=f"Failed to fetch snapshot rows: {rows_result}")
+            snapshot_rows = rows_result
+            logger.debug(f"[RESTORE] Fetched {len(snapshot_rows)} snapshot rows")
 
-        try:
-            with urllib.request.urlopen(req) as response:
-                if response.status != 200:
-                    logger.error(f"[RESTORE] Supabase returned status {response.status}")
-                    raise HTTPException(status_code=500, detail=f"Supabase error: {response.status}")
-                payload = response.read()
-        except urllib.error.HTTPError as exc:
-            body = exc.read().decode("utf-8", errors="ignore")
-            logger.error(f"[RESTORE] Supabase HTTP error {exc.status}: {body}")
-            raise HTTPException(status_code=500, detail=f"Supabase fetch failed: {exc.status}")
-
-        sample_rows = json.loads(payload)
+            if not snapshot_rows:
+                logger.warning(f"[RESTORE] No snapshot found for batch_id: {snapshot_batch_id}")
+                return {
+                    "status": "success",
+                    "message": f"No snapshot found (already restored or never created)",
+                    "count": 0,
+                }
 
-        # GRACEFUL DEGRADATION: If snapshot doesn't exist, return success (not error)
-        if not isinstance(sample_rows, list) or not sample_rows:
-            logger.warning(f"[RESTORE] No snapshot found for batch_id: {snapshot_batch_id}")
-            return {
-                "status": "success",
-                "message": f"No snapshot found (already restored or never created)",
-                "count": 0,
-            }
+            if isinstance(spreadsheet_result, BaseException):
+                logger.error(
+                    f"[RESTORE] Failed to fetch spreadsheet {spreadsheet_id}: {spreadsheet_result}",
+                    exc_info=spreadsheet_result,
+                )
+                raise HTTPException(status_code=500, detail=f"Failed to fetch spreadsheet: {spreadsheet_result}")
+            spreadsheet = spreadsheet_result
+        else:
+            # Fetch the whole batch in one query; spreadsheet_id and gid come from the rows
+            logger.info(f"[RESTORE] Fetching snapshot for batch_id: {snapshot_batch_id}")
+            try:
+                snapshot_rows = await asyncio.to_thread(_fetch_snapshot_rows, snapshot_batch_id)
+                logger.debug(f"[RESTORE] Fetched {len(snapshot_rows)} snapshot rows")
+            except Exception as exc:
+                logger.error(f"[RESTORE] Failed to fetch snapshot rows: {exc}", exc_info=True)
+                raise HTTPException(status_code=500, detail=f"Failed to fetch snapshot rows: {exc}")
 
-        # Extract spreadsheet_id and gid from first row
-        first_row = sample_rows[0]
-        spreadsheet_id = first_row.get("spreadsheet_id")
-        gid = first_row.get("gid")
+            # GRACEFUL DEGRADATION: If snapshot doesn't exist, return success (not error)
+            if not snapshot_rows:
+                logger.warning(f"[RESTORE] No snapshot found for batch_id: {snapshot_batch_id}")
+                return {
+                    "status": "success",
+                    "message": f"No snapshot found (already restored or never created)",
+                    "count": 0,
+                }
 
-        if not spreadsheet_id:
-            logger.error("[RESTORE] Snapshot missing spreadsheet_id")
-            raise HTTPException(status_code=500, detail="Snapshot is missing spreadsheet_id")
+            # Extract spreadsheet_id and gid from first row
+            first_row = snapshot_rows[0]
+            spreadsheet_id = first_row.get("spreadsheet_id")
+            gid = first_row.get("gid")
 
-        logger.info(f"[RESTORE] Extracted: spreadsheet_id={spreadsheet_id}, gid={gid}")
+            if not spreadsheet_id:
+                logger.error("[RESTORE] Snapshot missing spreadsheet_id")
+                raise HTTPException(status_code=500, detail="Snapshot is missing spreadsheet_id")
+
+            logger.info(f"[RESTORE] Extracted: spreadsheet_id={spreadsheet_id}, gid={gid}")
+
+            # A batch is written for a single sheet; drop any stray rows from another one
+            original_count = len(snapshot_rows)
+            snapshot_rows = [
+                row for row in snapshot_rows
+                if row.get("spreadsheet_id") == spreadsheet_id and row.get("gid") == gid
+            ]
+            if len(snapshot_rows) != original_count:
+                logger.warning(
+                    f"[RESTORE] Ignoring {original_count - len(snapshot_rows)} row(s) from a different sheet"
+                )
 
-        # Now fetch the full spreadsheet and sheet info
         try:
-            spreadsheet = validator.fetch_spreadsheet(spreadsheet_id)
-            logger.debug(f"[RESTORE] Fetched spreadsheet {spreadsheet_id}")
+            sheet = await asyncio.to_thread(_resolve_sheet_fresh, validator, spreadsheet_id, gid, spreadsheet)
+        except ValueError as exc:
+            logger.error(f"[RESTORE] {exc}")
+            raise HTTPException(status_code=404, detail=str(exc))
         except Exception as exc:
             logger.error(f"[RESTORE] Failed to fetch spreadsheet {spreadsheet_id}: {exc}", exc_info=True)
             raise HTTPException(status_code=500, detail=f"Failed to fetch spreadsheet: {exc}")
 
-        sheets = spreadsheet.get("sheets", [])
-        if not sheets:
-            logger.error("[RESTORE] No sheets available")
-            raise HTTPException(status_code=500, detail="No sheets available in spreadsheet")
-
-        # Find the sheet
-        sheet = None
-        if gid is None:
-            sheet = sheets[0]
-            logger.debug(f"[RESTORE] Using first sheet (no gid provided)")
-        else:
-            for candidate in sheets:
-                if candidate["properties"].get("sheetId") == gid:
-                    sheet = candidate
-                    logger.debug(f"[RESTORE] Found sheet with gid={gid}")
-                    break
-
-        if sheet is None:
-            logger.error(f"[RESTORE] No sheet found with gid={gid}")
-            raise HTTPException(status_code=404, detail=f"No sheet found with gid={gid}")
-
         sheet_props = sheet["properties"]
         sheet_id = sheet_props["sheetId"]
         sheet_title = sheet_props["title"]
 
         logger.info(f"[RESTORE] Restoring colors on sheet '{sheet_title}' (id={sheet_id})")
 
-        # Now fetch all snapshot rows for this spreadsheet
-        try:
-            snapshot_rows = _fetch_snapshot_rows(snapshot_batch_id, spreadsheet_id, gid)
-            logger.debug(f"[RESTORE] Fetched {len(snapshot_rows) if snapshot_rows else 0} snapshot rows")
-        except Exception as exc:
-            logger.error(f"[RESTORE] Failed to fetch snapshot rows: {exc}", exc_info=True)
-            raise HTTPException(status_code=500, detail=f"Failed to fetch snapshot rows: {exc}")
-
-        if not snapshot_rows:
-            logger.warning(f"[RESTORE] No snapshot rows for batch_id={snapshot_batch_id}")
-            return {
-                "status": "success",
-                "message": f"No snapshot rows found (already restored)",
-                "count": 0,
-            }
-
         # FILTER snapshot rows to only requested cells if cell_locations provided
         if expected_cells is not None:
-            actual_cells = {row["cell"] for row in snapshot_rows if "cell" in row}
-            missing = expected_cells - actual_cells
+            # CRITICAL: Filter to only restore the requested cells, noting which
+            # requested cells were found in the same pass
+            original_count = len(snapshot_rows)
+            found_cells: set[str] = set()
+            requested_rows: List[Dict[str, Any]] = []
+            for row in snapshot_rows:
+                cell = row.get("cell")
+                if cell in expected_cells:
+                    found_cells.add(cell)
+                    requested_rows.append(row)
+            snapshot_rows = requested_rows
+
+            missing = expected_cells - found_cells
             if missing:
                 logger.warning(f"[RESTORE] Snapshot missing {len(missing)} cell(s): {sorted(list(missing)[:5])}")
 
-            # CRITICAL: Filter to only restore the requested cells
-            original_count = len(snapshot_rows)
-            snapshot_rows = [row for row in snapshot_rows if row.get("cell") in expected_cells]
             logger.info(f"[RESTORE] Filtered from {original_count} to {len(snapshot_rows)} cell(s) based on cell_locations")
 
         # SKIP INVALID CELLS INSTEAD OF FAILING
-        requests: List[Dict[str, Any]] = []
+        colors_by_position: Dict[Tuple[int, int], Tuple[float, float, float]] = {}
         skipped = 0
 
         for row in snapshot_rows:
@@ -1375,27 +1766,23 @@ async def restore_colors(request: RestoreRequest) -> Dict[str, Any]:
             red = row.get("red")
             green = row.get("green")
             blue = row.get("blue")
-            if not all(isinstance(v, (int, float)) for v in (red, green, blue)):
+            if not (
+                isinstance(red, (int, float))
+                and isinstance(green, (int, float))
+                and isinstance(blue, (int, float))
+            ):
                 logger.warning(f"[RESTORE] Snapshot row for '{cell}' has invalid color values, skipping")
                 skipped += 1
                 continue
 
             try:
-                row_index, col_index = _parse_cell(cell)
-                requests.append(
-                    _build_repeat_cell(
-                        sheet_id,
-                        row_index,
-                        col_index,
-                        {"red": float(red), "green": float(green), "blue": float(blue)},
-                    )
-                )
+                colors_by_position[_parse_cell(cell)] = (red, green, blue)
             except Exception as exc:
                 logger.warning(f"[RESTORE] Failed to parse cell '{cell}': {exc}")
                 skipped += 1
                 continue
 
-        if not requests:
+        if not colors_by_position:
             logger.warning("[RESTORE] No valid cells to restore")
             return {
                 "status": "success",
@@ -1403,22 +1790,52 @@ async def restore_colors(request: RestoreRequest) -> Dict[str, Any]:
                 "count": 0,
             }
 
-        logger.info(f"[RESTORE] Restoring {len(requests)} cell(s), skipped {skipped}")
+        # One repeatCell per same-colored rectangle instead of one per cell
+        # (_build_repeat_cell does the float() conversion)
+        requests = [
+            _build_repeat_cell(
+                sheet_id,
+                row_index,
+                col_index,
+                {"red": red, "green": green, "blue": blue},
+                row_count,
+                col_count,
+            )
+            for row_index, col_index, row_count, col_count, (red, green, blue)
+            in _coalesce_color_cells(colors_by_position)
+        ]
+        restored_count = len(colors_by_position)
+
+        logger.info(
+            f"[RESTORE] Restoring {restored_count} cell(s) in {len(requests)} request(s), skipped {skipped}"
+        )
 
+        # Rectangles never overlap, so chunks are independent and can be
+        # applied concurrently without changing the result.
+        chunks = [
+            requests[i:i + _BATCH_UPDATE_CHUNK_SIZE]
+            for i in range(0, len(requests), _BATCH_UPDATE_CHUNK_SIZE)
+        ]
         try:
-            validator.service.spreadsheets().batchUpdate(
-                spreadsheetId=spreadsheet_id,
-                body={"requests": requests},
-            ).execute()
-            logger.info(f"[RESTORE] ✓ Successfully restored {len(requests)} cell color(s)")
+            await asyncio.gather(*(
+                asyncio.to_thread(
+                    _sheets_request,
+                    validator,
+                    "POST",
+                    f"{spreadsheet_id}:batchUpdate",
+                    body={"requests": chunk},
+                )
+                for chunk in chunks
+            ))
+            logger.info(f"[RESTORE] ✓ Successfully restored {restored_count} cell color(s)")
         except Exception as exc:
             logger.error(f"[RESTORE] Failed to execute batchUpdate: {exc}", exc_info=True)
             raise HTTPException(status_code=500, detail=f"Failed to update spreadsheet: {exc}")
 
         return {
             "status": "success",
-            "message": f"Restored {len(requests)} cell color(s) on '{sheet_title}' from snapshot batch.",
-            "count": len(requests),
+            "message": f"Restored {restored_count} cell color(s) on '{sheet_title}' from snapshot batch.",
+            "count": restored_count,
         }
 
     except HTTPException:
@@ -1439,33 +1856,53 @@ def _fetch_cell_values(
     sheet_title: str,
     cell_locations: List[str],
 ) -> Dict[str, Any]:
-    """Fetch current values for cells to snapshot before update."""
+    """Fetch current values for cells to snapshot before update.
+
+    Uses a single values.batchGet call; if that fails (e.g. one range is out of
+    bounds), falls back to per-range reads so valid cells are still captured.
+    """
     values_by_cell: Dict[str, Any] = {}
+    ranges = [f"'{sheet_title}'!{cell_loc}" for cell_loc in cell_locations]
 
-    for cell_loc in cell_locations:
-        try:
-            sheet_range = f"'{sheet_title}'!{cell_loc}"
-            response = validator.service.spreadsheets().values().get(
-                spreadsheetId=spreadsheet_id,
-                range=sheet_range,
-                valueRenderOption="UNFORMATTED_VALUE",
-            ).execute()
-
-            cell_values = response.get("values", [])
-
-            # Handle single cell vs range
-            if ":" in cell_loc:
-                # It's a range - store the full 2D array
-                values_by_cell[cell_loc] = cell_values
+    try:
+        response = _sheets_request(
+            validator,
+            "GET",
+            f"{spreadsheet_id}/values:batchGet",
+            params={"ranges": ranges, "valueRenderOption": "UNFORMATTED_VALUE"},
+        )
+        value_ranges = response.get("valueRanges", [])
+    except Exception as exc:
+        logger.warning(f"batchGet failed, falling back to per-range reads: {exc}")
+        value_ranges = None
+
+    for index, cell_loc in enumerate(cell_locations):
+        if value_ranges is not None:
+            entry = value_ranges[index] if index < len(value_ranges) else {}
+            cell_values = entry.get("values", [])
+        else:
+            try:
+                cell_values = _sheets_request(
+                    validator,
+                    "GET",
+                    f"{spreadsheet_id}/values/{quote(ranges[index], safe='')}",
+                    params={"valueRenderOption": "UNFORMATTED_VALUE"},
+                ).get("values", [])
+            except Exception:
+                # Cell may be empty or out of bounds - treat as None
+                values_by_cell[cell_loc] = None
+                continue
+
+        # Handle single cell vs range
+        if ":" in cell_loc:
+            # It's a range - store the full 2D array
+            values_by_cell[cell_loc] = cell_values
+        else:
+            # Single cell - extract the value
+            if cell_values and cell_values[0]:
+                values_by_cell[cell_loc] = cell_values[0][0]
             else:
-                # Single cell - extract the value
-                if cell_values and cell_values[0]:
-                    values_by_cell[cell_loc] = cell_values[0][0]
-                else:
-                    values_by_cell[cell_loc] = None
-        except Exception:
-            # Cell may be empty or out of bounds - treat as None
-            values_by_cell[cell_loc] = None
+                values_by_cell[cell_loc] = None
 
     return values_by_cell
 
@@ -1489,7 +1926,7 @@ def _snapshot_cell_values(
             "spreadsheet_id": spreadsheet_id,
             "gid": gid,
             "cell": cell_loc,
-            "value": json.dumps(value) if value is not None else None,
+            "value": dump_json_bytes(value).decode("utf-8") if value is not None else None,
             "snapshot_type": "cell_value",
         })
 
@@ -1518,35 +1955,19 @@ def _post_value_snapshot_to_supabase(rows: List[Dict[str, Any]]) -> None:
         )
         raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be configured.")
 
-    url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cell_value_snapshots"
-    logger.debug(f"Posting {len(rows)} row(s) to Supabase: {url}")
-
-    request = urllib.request.Request(
-        url,
-        method="POST",
-        data=json.dumps(rows).encode("utf-8"),
-        headers={
-            "Content-Type": "application/json",
-            "apikey": SUPABASE_SERVICE_KEY,
-            "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-            "Prefer": "resolution=merge-duplicates",
-        },
-    )
+    logger.debug(f"Posting {len(rows)} row(s) to Supabase table cell_value_snapshots")
 
-    try:
-        with urllib.request.urlopen(request) as response:
-            if response.status not in (200, 201, 204):
-                logger.error(f"Unexpected Supabase response status: {response.status}")
-                raise RuntimeError(f"Unexpected Supabase status: {response.status}")
-            logger.debug(f"Successfully posted snapshot to Supabase: {response.status}")
-    except urllib.error.HTTPError as exc:
-        body = exc.read().decode("utf-8", errors="ignore")
-        logger.error(
-            f"Supabase insert failed: {exc.status}",
-            exc_info=True,
-            extra={"status_code": exc.status, "response_body": body}
-        )
-        raise RuntimeError(f"Supabase insert failed: {exc.status} {body}") from exc
+    for response in _post_supabase_batches("/cell_value_snapshots", rows):
+        if response.is_error:
+            logger.error(
+                f"Supabase insert failed: {response.status_code}",
+                extra={"status_code": response.status_code, "response_body": response.text}
+            )
+            raise RuntimeError(f"Supabase insert failed: {response.status_code} {response.text}")
+        if response.status_code not in (200, 201, 204):
+            logger.error(f"Unexpected Supabase response status: {response.status_code}")
+            raise RuntimeError(f"Unexpected Supabase status: {response.status_code}")
+    logger.debug(f"Successfully posted snapshot to Supabase ({len(rows)} row(s))")
 
 
 def _update_cells_core(request: UpdateCellsRequest) -> Dict[str, Any]:
@@ -1584,45 +2005,48 @@ def _update_cells_core(request: UpdateCellsRequest) -> Dict[str, Any]:
         logger.error("No spreadsheet URL/ID provided and no default configured")
         raise ValueError("No spreadsheet URL/ID provided and no default configured.")
 
-    url_id_match = re.search(r"/spreadsheets/d/([a-zA-Z0-9-_]+)", spreadsheet_url)
-    url_gid_match = re.search(r"[?&]gid=(\d+)", spreadsheet_url)
-    spreadsheet_id = url_id_match.group(1) if url_id_match else spreadsheet_url
-    gid = int(url_gid_match.group(1)) if url_gid_match else None
+    parsed_id, gid = _parse_spreadsheet_ref(spreadsheet_url)
+    spreadsheet_id = parsed_id or spreadsheet_url
 
     logger.debug(
         f"Parsed spreadsheet URL: id={spreadsheet_id}, gid={gid}",
         extra={"spreadsheet_id": spreadsheet_id, "gid": gid}
     )
 
-    logger.debug(f"Fetching spreadsheet metadata for {spreadsheet_id}")
-    spreadsheet = validator.fetch_spreadsheet(spreadsheet_id)
-    logger.info(f"Successfully fetched spreadsheet: {spreadsheet_id}")
-
-    # Resolve sheet - either by gid or by title
+    # Resolve sheet - either by gid or by title. Cached metadata may predate a
+    # new or renamed sheet, so a miss is retried once against fresh metadata.
     sheet = None
-    sheets = spreadsheet.get("sheets", [])
-    if not sheets:
-        logger.error("No sheets available in spreadsheet")
-        raise ValueError("No sheets available in spreadsheet.")
+    for refresh in (False, True):
+        logger.debug(f"Fetching spreadsheet metadata for {spreadsheet_id} (refresh={refresh})")
+        spreadsheet = _cached_fetch_spreadsheet(validator, spreadsheet_id, refresh=refresh)
+        logger.info(f"Successfully fetched spreadsheet: {spreadsheet_id}")
 
-    logger.debug(f"Resolving sheet '{request.sheet_title}' from {len(sheets)} available sheet(s)")
+        sheets = spreadsheet.get("sheets", [])
+        if not sheets:
+            logger.error("No sheets available in spreadsheet")
+            raise ValueError("No sheets available in spreadsheet.")
 
-    # First try to find by title
-    for candidate in sheets:
-        if candidate["properties"]["title"] == request.sheet_title:
-            sheet = candidate
-            logger.debug(f"Found sheet by title: '{request.sheet_title}'")
-            break
+        logger.debug(f"Resolving sheet '{request.sheet_title}' from {len(sheets)} available sheet(s)")
 
-    # If not found by title and gid is provided, try gid
-    if sheet is None and gid is not None:
-        logger.debug(f"Sheet not found by title, trying gid={gid}")
+        # First try to find by title
         for candidate in sheets:
-            if candidate["properties"].get("sheetId") == gid:
+            if candidate["properties"]["title"] == request.sheet_title:
                 sheet = candidate
-                logger.debug(f"Found sheet by gid: {gid}")
+                logger.debug(f"Found sheet by title: '{request.sheet_title}'")
                 break
 
+        # If not found by title and gid is provided, try gid
+        if sheet is None and gid is not None:
+            logger.debug(f"Sheet not found by title, trying gid={gid}")
+            for candidate in sheets:
+                if candidate["properties"].get("sheetId") == gid:
+                    sheet = candidate
+                    logger.debug(f"Found sheet by gid: {gid}")
+                    break
+
+        if sheet is not None:
+            break
+
     # If still not found, use first sheet and warn
     if sheet is None:
         sheet = sheets[0]
@@ -1663,48 +2087,33 @@ def _update_cells_core(request: UpdateCellsRequest) -> Dict[str, Any]:
         logger.debug("Skipping snapshot creation (create_snapshot=false)")
 
     # STEP 2: Apply updates using batch API
-    batch_data: List[Dict[str, Any]] = []
-    failed_updates: List[Dict[str, str]] = []
-
+    # The whole batch is written with USER_ENTERED, so is_formula needs no
+    # per-update handling; None clears the cell.
     logger.debug("Processing cell updates")
-    for update in request.updates:
-        try:
-            cell_range = f"'{sheet_title}'!{update.cell_location}"
-
-            # Determine value input option
-            value_input_option = "USER_ENTERED" if update.is_formula else "RAW"
-
-            # Handle None/null values
-            if update.value is None:
-                value_to_write = [[""]]
-            else:
-                value_to_write = [[update.value]]
-
-            batch_data.append({
-                "range": cell_range,
-                "values": value_to_write,
-            })
-        except Exception as exc:
-            logger.warning(
-                f"Failed to prepare update for {update.cell_location}: {exc}",
-                extra={"cell_location": update.cell_location, "error": str(exc)}
-            )
-            failed_updates.append({
-                "cell_location": update.cell_location,
-                "error": str(exc),
-            })
+    sheet_prefix = f"'{sheet_title}'!"
+    batch_data: List[Dict[str, Any]] = [
+        {
+            "range": sheet_prefix + update.cell_location,
+            "values": [[""]] if update.value is None else [[update.value]],
+        }
+        for update in request.updates
+    ]
+    # Preparing an entry cannot fail; kept for the response contract
+    failed_updates: List[Dict[str, str]] = []
 
     # Execute batch update
     if batch_data:
         logger.info(f"Executing batch update for {len(batch_data)} cell(s)")
         try:
-            validator.service.spreadsheets().values().batchUpdate(
-                spreadsheetId=spreadsheet_id,
+            _sheets_request(
+                validator,
+                "POST",
+                f"{spreadsheet_id}/values:batchUpdate",
                 body={
                     "valueInputOption": "USER_ENTERED",
                     "data": batch_data,
                 },
-            ).execute()
+            )
             logger.info("Batch update completed successfully")
         except Exception as exc:
             logger.error(f"Batch update failed: {exc}", exc_info=True)
@@ -1768,8 +2177,8 @@ async def update_cells(request: UpdateCellsRequest) -> Dict[str, Any]:
     }
     """
     try:
-        # Call the synchronous core function
-        return _update_cells_core(request)
+        # The core function is synchronous (shared with the orchestrator); run it off the event loop
+        return await asyncio.to_thread(_update_cells_core, request)
     except ValueError as e:
         # Convert ValueError to HTTPException
         raise HTTPException(status_code=400, detail=str(e))
@@ -1820,38 +2229,30 @@ async def restore_cell_values(request: RestoreRequest) -> Dict[str, Any]:
         # Fetch snapshot rows from Supabase
         logger.info(f"[RESTORE_CELLS] Fetching cell value snapshot for batch_id: {snapshot_batch_id}")
 
-        params = {
-            "select": "cell,value,spreadsheet_id,gid",
-            "snapshot_batch_id": f"eq.{snapshot_batch_id}",
-        }
-        query = urllib.parse.urlencode(params, doseq=True)
-        url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cell_value_snapshots?{query}"
-
-        req = urllib.request.Request(
-            url,
-            method="GET",
-            headers={
-                "apikey": SUPABASE_SERVICE_KEY,
-                "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-                "Accept": "application/json",
-            },
-        )
+        # Let PostgREST filter to the requested cells; very long lists are
+        # filtered below instead to stay under URL length limits.
+        cell_locations = request.cell_locations or []
+        filter_server_side = 0 < len(cell_locations) <= _MAX_SERVER_SIDE_CELL_FILTER
 
         try:
-            with urllib.request.urlopen(req) as response:
-                if response.status != 200:
-                    logger.error(f"[RESTORE_CELLS] Supabase returned status {response.status}")
-                    raise HTTPException(status_code=500, detail=f"Supabase error: {response.status}")
-                payload = response.read()
-        except urllib.error.HTTPError as exc:
-            body = exc.read().decode("utf-8", errors="ignore")
-            logger.error(f"[RESTORE_CELLS] Supabase HTTP error {exc.status}: {body}")
-            raise HTTPException(status_code=500, detail=f"Supabase fetch failed: {exc.status}")
-
-        snapshot_rows = json.loads(payload)
+            snapshot_rows = await asyncio.to_thread(
+                _fetch_value_snapshot_rows,
+                snapshot_batch_id,
+                cell_locations if filter_server_side else None,
+            )
+        except Exception as exc:
+            logger.error(f"[RESTORE_CELLS] {exc}")
+            raise HTTPException(status_code=500, detail=str(exc))
 
         # GRACEFUL DEGRADATION: If snapshot doesn't exist, return success (not error)
         if not isinstance(snapshot_rows, list) or not snapshot_rows:
+            if filter_server_side:
+                logger.warning("[RESTORE_CELLS] No matching cells found in snapshot")
+                return {
+                    "status": "success",
+                    "message": "No matching cells found in snapshot",
+                    "count": 0,
+                }
             logger.warning(f"[RESTORE_CELLS] No snapshot found for batch_id: {snapshot_batch_id}")
             return {
                 "status": "success",
@@ -1859,9 +2260,9 @@ async def restore_cell_values(request: RestoreRequest) -> Dict[str, Any]:
                 "count": 0,
             }
 
-        # Filter by cell_locations if provided
-        if request.cell_locations:
-            expected_cells = set(request.cell_locations)
+        # Filter by cell_locations if the list was too long to filter server-side
+        if cell_locations and not filter_server_side:
+            expected_cells = frozenset(cell_locations)
             snapshot_rows = [row for row in snapshot_rows if row.get("cell") in expected_cells]
             logger.debug(f"[RESTORE_CELLS] Filtered to {len(snapshot_rows)} cells matching request")
 
@@ -1885,33 +2286,14 @@ async def restore_cell_values(request: RestoreRequest) -> Dict[str, Any]:
         logger.info(f"[RESTORE_CELLS] Extracted: spreadsheet_id={spreadsheet_id}, gid={gid}")
 
         try:
-            spreadsheet = validator.fetch_spreadsheet(spreadsheet_id)
-            logger.debug(f"[RESTORE_CELLS] Fetched spreadsheet {spreadsheet_id}")
+            sheet = await asyncio.to_thread(_resolve_sheet_fresh, validator, spreadsheet_id, gid)
+        except ValueError as exc:
+            logger.error(f"[RESTORE_CELLS] {exc}")
+            raise HTTPException(status_code=404, detail=str(exc))
         except Exception as exc:
             logger.error(f"[RESTORE_CELLS] Failed to fetch spreadsheet {spreadsheet_id}: {exc}", exc_info=True)
             raise HTTPException(status_code=500, detail=f"Failed to fetch spreadsheet: {exc}")
 
-        sheets = spreadsheet.get("sheets", [])
-        if not sheets:
-            logger.error("[RESTORE_CELLS] No sheets available")
-            raise HTTPException(status_code=500, detail="No sheets available in spreadsheet")
-
-        # Find sheet by gid
-        sheet = None
-        if gid is None:
-            sheet = sheets[0]
-            logger.debug(f"[RESTORE_CELLS] Using first sheet (no gid provided)")
-        else:
-            for candidate in sheets:
-                if candidate["properties"].get("sheetId") == gid:
-                    sheet = candidate
-                    logger.debug(f"[RESTORE_CELLS] Found sheet with gid={gid}")
-                    break
-
-        if sheet is None:
-            logger.error(f"[RESTORE_CELLS] No sheet found with gid={gid}")
-            raise HTTPException(status_code=404, detail=f"No sheet found with gid={gid}")
-
         sheet_props = sheet["properties"]
         sheet_title = sheet_props["title"]
 
@@ -1935,8 +2317,8 @@ async def restore_cell_values(request: RestoreRequest) -> Dict[str, Any]:
                 value = None
             else:
                 try:
-                    value = json.loads(value_json)
-                except json.JSONDecodeError:
+                    value = load_json(value_json)
+                except ValueError:
                     logger.warning(f"[RESTORE_CELLS] Failed to parse value for cell '{cell}', using raw string")
                     value = value_json  # Fallback to string
 
@@ -1969,13 +2351,16 @@ async def restore_cell_values(request: RestoreRequest) -> Dict[str, Any]:
 
         # Execute batch restore
         try:
-            validator.service.spreadsheets().values().batchUpdate(
-                spreadsheetId=spreadsheet_id,
+            await asyncio.to_thread(
+                _sheets_request,
+                validator,
+                "POST",
+                f"{spreadsheet_id}/values:batchUpdate",
                 body={
                     "valueInputOption": "USER_ENTERED",
                     "data": batch_data,
                 },
-            ).execute()
+            )
             logger.info(f"[RESTORE_CELLS] ✓ Successfully restored {len(batch_data)} cell value(s)")
         except Exception as exc:
             logger.error(f"[RESTORE_CELLS] Failed to execute batchUpdate: {exc}", exc_info=True)
@@ -2010,6 +2395,12 @@ class RegisterTesterRequest(BaseModel):
     """Request to ensure a user is on the OAuth consent screen tester list."""
     user_email: str
 
+    @field_validator("user_email")
+    @classmethod
+    def _normalize_email(cls, value: str) -> str:
+        # Normalize once so logs, the tester cache and the consent list all see one spelling
+        return value.strip().lower()
+
 
 @app.post("/extension/check-access")
 async def check_sheet_access(request: InstallExtensionRequest) -> Dict[str, Any]:
@@ -2035,7 +2426,7 @@ async def check_sheet_access(request: InstallExtensionRequest) -> Dict[str, Any]
         from .apps_script_installer import AppsScriptInstaller
 
         installer = AppsScriptInstaller()
-        access_info = installer.check_sheet_access(request.spreadsheet_id)
+        access_info = await asyncio.to_thread(installer.check_sheet_access, request.spreadsheet_id)
         access_info["serviceAccountEmail"] = installer.get_service_account_email()
 
         return access_info
@@ -2076,7 +2467,7 @@ async def register_tester(request: RegisterTesterRequest) -> Dict[str, Any]:
             extra={"user_email": request.user_email}
         )
 
-        result = manager.ensure_test_user(request.user_email)
+        result = await asyncio.to_thread(manager.ensure_test_user, request.user_email)
 
         logger.info(
             "[register-tester] Successfully registered tester: %s, added=%s",
@@ -2155,7 +2546,8 @@ async def install_extension(request: InstallExtensionRequest) -> Dict[str, Any]:
 
         # Install the extension
         installer = AppsScriptInstaller(user_credentials=user_credentials)
-        result = installer.install_extension(
+        result = await asyncio.to_thread(
+            installer.install_extension,
             spreadsheet_id=request.spreadsheet_id,
             code_gs_content=code_gs_content,
             sidebar_html_content=sidebar_html_content,
@@ -1,14 +1,37 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from functools import lru_cache
 
 from .models import ChatRequest, ChatResponse
 from .orchestrator import AgentOrchestrator
-from .llm import create_llm_client
+from .llm import LLMClient, create_llm_client
 from .sheets_client import ServiceAccountSheetsClient
 from .context_builder import ContextBuilder
 
 
+@lru_cache(maxsize=1)
+def _shared_llm_client() -> LLMClient:
+  return create_llm_client()
+
+
+async def aclose_shared_llm_client() -> None:
+  """Close the shared LLM client's connection pools if it was ever built."""
+  if _shared_llm_client.cache_info().currsize:
+    await _shared_llm_client().aclose()
+
+
+@lru_cache(maxsize=1)
+def _shared_sheets_client() -> ServiceAccountSheetsClient:
+  # Loads credentials and builds the API client; do it once per process
+  return ServiceAccountSheetsClient()
+
+
+@lru_cache(maxsize=1)
+def _shared_context_builder() -> ContextBuilder:
+  return ContextBuilder(_shared_sheets_client())
+
+
 class ChatBackend(ABC):
   """
   Abstract chat backend. This allows us to later swap out the
@@ -28,13 +51,11 @@ class PythonChatBackend(ChatBackend):
   """
 
   def __init__(self) -> None:
-    llm_client = create_llm_client()
-    sheets_client = ServiceAccountSheetsClient()
-    context_builder = ContextBuilder(sheets_client)
+    # The clients are stateless, so every backend shares one set per process
     self._orchestrator = AgentOrchestrator(
-      llm_client=llm_client,
-      sheets_client=sheets_client,
-      context_builder=context_builder,
+      llm_client=_shared_llm_client(),
+      sheets_client=_shared_sheets_client(),
+      context_builder=_shared_context_builder(),
     )
 
   def send_chat(self, request: ChatRequest) -> ChatResponse:
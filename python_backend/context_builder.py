@@ -1,8 +1,33 @@
 from __future__ import annotations
 
+from collections import Counter
 from typing import Any, Dict, List, Optional
 
 from .sheets_client import ServiceAccountSheetsClient
+from .utils import column_to_letter
+
+# Column inference reads at most this many data rows unless the caller asks for a full scan.
+DEFAULT_INFERENCE_SAMPLE_ROWS = 10_000
+
+
+def _find_header_row(rows: List[List[Dict[str, Any]]], max_rows: int = 10) -> int:
+  """
+  Return the index of the first of the top rows that is >70% strings, or -1.
+
+  The threshold is compared in integers (strings * 10 > non_empty * 7) to keep
+  float division out of the per-row check.
+  """
+  for i, row in enumerate(rows[:max_rows]):
+    non_empty = strings = 0
+    for cell in row:
+      if cell.get("value") is None:
+        continue
+      non_empty += 1
+      if cell.get("type") == "string":
+        strings += 1
+    if non_empty and strings * 10 > non_empty * 7:
+      return i
+  return -1
 
 
 class ContextBuilder:
@@ -15,7 +40,13 @@ class ContextBuilder:
   def __init__(self, client: ServiceAccountSheetsClient) -> None:
     self.client = client
 
-  def build_context(self, spreadsheet_id: str, sheet_title: str, gid: Optional[str] = None) -> Dict[str, Any]:
+  def build_context(
+    self,
+    spreadsheet_id: str,
+    sheet_title: str,
+    gid: Optional[str] = None,
+    sample_rows: Optional[int] = DEFAULT_INFERENCE_SAMPLE_ROWS,
+  ) -> Dict[str, Any]:
     """
     Build context for a sheet.
 
@@ -23,6 +54,7 @@ class ContextBuilder:
       spreadsheet_id: The bare spreadsheet ID (not a URL)
       sheet_title: The sheet title (name), or None if using gid
       gid: The sheet gid (ID) to resolve to a title, optional
+      sample_rows: Number of data rows column inference looks at; None scans every row
     """
     # If gid is provided but no sheet_title, resolve the title from gid
     if gid and not sheet_title:
@@ -46,7 +78,7 @@ class ContextBuilder:
     range_a1 = f"{sheet_title}!A1:{self._column_to_letter(col_count)}{row_count}"
     data = self.client.read_range_with_formulas(spreadsheet_id, range_a1)
 
-    table_regions = self._detect_table_regions(data)
+    table_regions = self._detect_table_regions(data, sample_rows=sample_rows)
     summary = self._generate_summary(data)
     sample_data = self._sample_data(data, top_n=150)
 
@@ -98,25 +130,22 @@ class ContextBuilder:
 
   # --- internals ---
 
-  def _detect_table_regions(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+  def _detect_table_regions(
+    self,
+    data: Dict[str, Any],
+    sample_rows: Optional[int] = DEFAULT_INFERENCE_SAMPLE_ROWS,
+  ) -> List[Dict[str, Any]]:
     regions: List[Dict[str, Any]] = []
     rows: List[List[Dict[str, Any]]] = data.get("values") or []
 
     if not rows:
       return regions
 
-    header_row_index = -1
-    for i in range(min(10, len(rows))):
-      row = rows[i]
-      non_empty = len([cell for cell in row if cell.get("value") is not None])
-      strings = len([cell for cell in row if cell.get("type") == "string"])
-      if non_empty > 0 and strings / non_empty > 0.7:
-        header_row_index = i
-        break
+    header_row_index = _find_header_row(rows)
 
     if header_row_index == -1:
       # No clear header; treat entire sheet as single region without headers
-      columns = self._infer_columns(data, header_row_index)
+      columns = self._infer_columns(data, header_row_index, sample_rows=sample_rows)
       regions.append(
         {
           "range": data,
@@ -128,7 +157,7 @@ class ContextBuilder:
       return regions
 
     data_start_row = header_row_index + 1
-    columns = self._infer_columns(data, header_row_index)
+    columns = self._infer_columns(data, header_row_index, sample_rows=sample_rows)
     regions.append(
       {
         "range": data,
@@ -140,53 +169,55 @@ class ContextBuilder:
     )
     return regions
 
-  def _infer_columns(self, data: Dict[str, Any], header_row: int) -> List[Dict[str, Any]]:
+  def _infer_columns(
+    self,
+    data: Dict[str, Any],
+    header_row: int,
+    sample_rows: Optional[int] = DEFAULT_INFERENCE_SAMPLE_ROWS,
+  ) -> List[Dict[str, Any]]:
     rows: List[List[Dict[str, Any]]] = data.get("values") or []
     if not rows:
       return []
 
+    # Very tall sheets are inferred from their first sample_rows data rows; stats such as
+    # nullable/uniqueValues then describe that sample.
+    data_start = header_row + 1
+    data_rows = rows[data_start:] if sample_rows is None else rows[data_start : data_start + sample_rows]
+
     num_columns = len(rows[0])
     columns: List[Dict[str, Any]] = []
 
-    for col_index in range(num_columns):
-      column_cells = [
-        row[col_index]
-        for row in rows[header_row + 1 :]
-        if len(row) > col_index and row[col_index].get("value") is not None
-      ]
-
-      # Determine dominant type
-      type_counts: Dict[str, int] = {}
-      for cell in column_cells:
-        t = cell.get("type", "string")
-        type_counts[t] = type_counts.get(t, 0) + 1
-
-      if type_counts:
-        dominant_type = max(type_counts.keys(), key=lambda k: type_counts[k])
-      else:
-        dominant_type = "string"
-
-      # Map to 'mixed' when multiple types appear
-      if len(type_counts) > 1:
-        dominant_type = "mixed"
-
-      unique_values = len({cell.get("value") for cell in column_cells})
-      sample_values = [cell.get("value") for cell in column_cells[:5]]
-
-      if header_row >= 0 and len(rows) > header_row and len(rows[header_row]) > col_index:
-        header_cell = rows[header_row][col_index]
-        name = str(header_cell.get("value")) if header_cell.get("value") is not None else self._column_to_letter(
-          col_index + 1
-        )
-      else:
-        name = self._column_to_letter(col_index + 1)
+    # Transpose the data rows into per-column value lists in one row-major pass. Column types
+    # are inferred in the same pass by promoting on mismatch: unseen -> concrete type -> "mixed".
+    values_by_column: List[List[Any]] = [[] for _ in range(num_columns)]
+    type_by_column: List[Optional[str]] = [None] * num_columns
+    for row in data_rows:
+      for col_index, (column_values, cell) in enumerate(zip(values_by_column, row)):
+        value = cell.get("value")
+        if value is None:
+          continue
+        column_values.append(value)
+        cell_type = cell.get("type", "string")
+        current = type_by_column[col_index]
+        if current != cell_type:
+          type_by_column[col_index] = cell_type if current is None else "mixed"
+
+    header_values = [cell.get("value") for cell in rows[header_row]] if 0 <= header_row < len(rows) else []
+
+    for col_index, (column_values, inferred_type) in enumerate(zip(values_by_column, type_by_column)):
+      dominant_type = inferred_type or "string"
+      unique_values = len(set(column_values))
+      sample_values = column_values[:5]
+
+      header_value = header_values[col_index] if col_index < len(header_values) else None
+      name = str(header_value) if header_value is not None else self._column_to_letter(col_index + 1)
 
       columns.append(
         {
           "index": col_index,
           "name": name,
           "type": dominant_type,
-          "nullable": len(column_cells) < len(rows) - (header_row + 1),
+          "nullable": len(column_values) < len(data_rows),
           "uniqueValues": unique_values,
           "sampleValues": sample_values,
         }
@@ -195,8 +226,11 @@ class ContextBuilder:
     return columns
 
   def _generate_summary(self, data: Dict[str, Any]) -> Dict[str, Any]:
-    all_cells: List[Dict[str, Any]] = [cell for row in data.get("values") or [] for cell in row]
-    total_cells = len(all_cells)
+    # Single pass over the grid; the empty/formula/error tallies fall out of the type counts.
+    data_types: Dict[str, int] = dict(
+      Counter(cell.get("type", "empty") for row in data.get("values") or [] for cell in row)
+    )
+    total_cells = sum(data_types.values())
     if total_cells == 0:
       return {
         "totalCells": 0,
@@ -206,33 +240,20 @@ class ContextBuilder:
         "dataTypes": {},
       }
 
-    empty_cells = sum(1 for c in all_cells if c.get("type") == "empty")
-    formula_cells = sum(1 for c in all_cells if c.get("type") == "formula")
-    error_cells = sum(1 for c in all_cells if c.get("type") == "error")
-
-    data_types: Dict[str, int] = {}
-    for c in all_cells:
-      t = c.get("type", "empty")
-      data_types[t] = data_types.get(t, 0) + 1
-
     return {
       "totalCells": total_cells,
-      "emptyCells": empty_cells,
-      "formulaCells": formula_cells,
-      "errorCells": error_cells,
+      "emptyCells": data_types.get("empty", 0),
+      "formulaCells": data_types.get("formula", 0),
+      "errorCells": data_types.get("error", 0),
       "dataTypes": data_types,
     }
 
   def _sample_data(self, data: Dict[str, Any], top_n: int = 150) -> List[Dict[str, Any]]:
     rows: List[List[Dict[str, Any]]] = data.get("values") or []
-    sampled_rows = rows[: min(top_n, len(rows))]
-    return [
-      {
-        **data,
-        "values": sampled_rows,
-        "endRow": min(top_n - 1, data.get("endRow", len(rows) - 1)),
-      }
-    ]
+    sample = {key: value for key, value in data.items() if key not in ("values", "endRow")}
+    sample["values"] = rows[:top_n]
+    sample["endRow"] = min(top_n - 1, data.get("endRow", len(rows) - 1))
+    return [sample]
 
   @staticmethod
   def generate_text_description(context: Dict[str, Any]) -> str:
@@ -240,44 +261,39 @@ class ContextBuilder:
     table_regions = context.get("tableRegions") or []
     summary = context.get("summary") or {}
 
-    description = f"# Sheet: {sheet_meta.get('title')}\n\n"
-    description += f"Dimensions: {sheet_meta.get('rowCount')} rows × {sheet_meta.get('columnCount')} columns\n\n"
+    parts: List[str] = []
+    add = parts.append
+    add(f"# Sheet: {sheet_meta.get('title')}\n\n")
+    add(f"Dimensions: {sheet_meta.get('rowCount')} rows × {sheet_meta.get('columnCount')} columns\n\n")
 
-    description += "## Summary\n"
-    description += f"- Total cells: {summary.get('totalCells')}\n"
-    description += f"- Empty cells: {summary.get('emptyCells')}\n"
+    add("## Summary\n")
+    add(f"- Total cells: {summary.get('totalCells')}\n")
+    add(f"- Empty cells: {summary.get('emptyCells')}\n")
     total_cells = summary.get("totalCells") or 1
     empty_cells = summary.get("emptyCells") or 0
     pct_empty = (empty_cells / total_cells) * 100 if total_cells else 0
-    description += f"- Empty cells: {empty_cells} ({pct_empty:.1f}%)\n"
-    description += f"- Formula cells: {summary.get('formulaCells')}\n"
-    description += f"- Error cells: {summary.get('errorCells')}\n\n"
+    add(f"- Empty cells: {empty_cells} ({pct_empty:.1f}%)\n")
+    add(f"- Formula cells: {summary.get('formulaCells')}\n")
+    add(f"- Error cells: {summary.get('errorCells')}\n\n")
 
     if table_regions:
-      description += "## Table Structure\n\n"
+      add("## Table Structure\n\n")
       for idx, region in enumerate(table_regions):
-        description += f"### Table {idx + 1}\n"
-        description += f"Has headers: {region.get('hasHeaders')}\n"
+        add(f"### Table {idx + 1}\n")
+        add(f"Has headers: {region.get('hasHeaders')}\n")
         data_start = (region.get("dataStartRow") or 0) + 1
-        description += f"Data starts at row: {data_start}\n\n"
+        add(f"Data starts at row: {data_start}\n\n")
 
-        description += "Columns:\n"
+        add("Columns:\n")
         for col in region.get("columns") or []:
-          description += f"- {col.get('name')} ({col.get('type')}{', nullable' if col.get('nullable') else ''})\n"
+          add(f"- {col.get('name')} ({col.get('type')}{', nullable' if col.get('nullable') else ''})\n")
           samples = col.get("sampleValues") or []
           if samples:
-            description += f"  Sample: {', '.join(map(str, samples[:3]))}\n"
-        description += "\n"
+            add(f"  Sample: {', '.join(map(str, samples[:3]))}\n")
+        add("\n")
 
-    return description
+    return "".join(parts)
 
-  @staticmethod
-  def _column_to_letter(column: int) -> str:
-    letter = ""
-    while column > 0:
-      remainder = (column - 1) % 26
-      letter = chr(65 + remainder) + letter
-      column = (column - 1) // 26
-    return letter
+  _column_to_letter = staticmethod(column_to_letter)
 
 
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import re
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from typing import Iterable, List, Optional
 
 from .logging_config import get_logger
@@ -9,6 +12,9 @@ from .supabase_client import get_supabase_client
 
 logger = get_logger(__name__)
 
+_INSERT_CHUNK_SIZE = 500
+_SHEET_ID_RE = re.compile(r"/d/([^/?#]+)")
+
 
 class ConversationLogger:
   """
@@ -20,6 +26,10 @@ class ConversationLogger:
 
   def __init__(self) -> None:
     self._client = get_supabase_client()
+    # sheet_tabs ids never change once created, so repeat logs for the same tab skip the round-trip.
+    self._resolve_sheet_tab_id = lru_cache(maxsize=1024)(self._upsert_sheet_tab)
+    # One worker keeps background writes in submission order.
+    self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conversation-log")
     if self._client:
       logger.info("ConversationLogger enabled with Supabase client")
     else:
@@ -104,20 +114,17 @@ class ConversationLogger:
 
     sheet_tab_id = self._get_or_create_sheet_tab(sheet_context) if sheet_context else None
 
-    rows: List[dict] = []
-    for msg in messages:
-      rows.append(
-        {
-          "session_id": session_id,
-          "message_id": msg.id,
-          "role": msg.role.value,
-          "content": msg.content,
-          "metadata": msg.metadata.model_dump(exclude_none=True)
-          if msg.metadata is not None
-          else None,
-          "sheet_tab_id": sheet_tab_id,
-        }
-      )
+    rows: List[dict] = [
+      {
+        "session_id": session_id,
+        "message_id": msg.id,
+        "role": msg.role.value,
+        "content": msg.content,
+        "metadata": msg.metadata.model_dump(exclude_none=True) if msg.metadata is not None else None,
+        "sheet_tab_id": sheet_tab_id,
+      }
+      for msg in messages
+    ]
 
     if not rows:
       logger.debug("No messages to log")
@@ -125,7 +132,9 @@ class ConversationLogger:
 
     try:
       logger.debug(f"Logging {len(rows)} message(s) to Supabase for session {session_id}")
-      self._client.table("conversation_messages").insert(rows).execute()
+      # Large batches are split so a single oversized insert can't time out.
+      for start in range(0, len(rows), _INSERT_CHUNK_SIZE):
+        self._client.table("conversation_messages").insert(rows[start : start + _INSERT_CHUNK_SIZE]).execute()
       logger.debug(f"Successfully logged {len(rows)} message(s)")
     except Exception as e:
       # Persistence failures should not break the chat experience.
@@ -135,6 +144,28 @@ class ConversationLogger:
       )
       return
 
+  def log_messages_in_background(
+    self,
+    session_id: str,
+    messages: Iterable[ChatMessage],
+    sheet_context: Optional[SheetContext] = None,
+  ) -> Optional[Future]:
+    """
+    Queue log_messages on a background worker so callers don't wait on the
+    sheet_tabs upsert and message insert round-trips.
+    """
+    if not self._client:
+      return None
+    future = self._background.submit(self.log_messages, session_id, list(messages), sheet_context)
+    future.add_done_callback(self._report_background_failure)
+    return future
+
+  @staticmethod
+  def _report_background_failure(future: Future) -> None:
+    exc = future.exception()
+    if exc is not None:
+      logger.warning(f"Background conversation logging failed: {str(exc)}")
+
   def _get_or_create_sheet_tab(self, ctx: SheetContext) -> Optional[str]:
     """
     Ensure there is a sheet_tabs row for the given SheetContext and return its id.
@@ -159,38 +190,36 @@ class ConversationLogger:
       spreadsheet_url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
 
     try:
-      # Look up existing tab first
-      existing = (
-        self._client.table("sheet_tabs")
-        .select("id")
-        .eq("spreadsheet_id", spreadsheet_id)
-        .eq("sheet_title", sheet_title)
-        .limit(1)
-        .execute()
-      )
-      data = getattr(existing, "data", None)
-      if isinstance(data, list) and data:
-        return data[0].get("id")
-
-      # Insert new row
-      created = (
-        self._client.table("sheet_tabs")
-        .insert(
-          {
-            "spreadsheet_id": spreadsheet_id,
-            "spreadsheet_url": spreadsheet_url,
-            "sheet_title": sheet_title,
-          }
-        )
-        .execute()
-      )
-      cdata = getattr(created, "data", None)
-      if isinstance(cdata, list) and cdata:
-        return cdata[0].get("id")
+      return self._resolve_sheet_tab_id(spreadsheet_id, sheet_title, spreadsheet_url)
     except Exception:
       return None
 
-    return None
+  def _upsert_sheet_tab(self, spreadsheet_id: str, sheet_title: str, spreadsheet_url: str) -> str:
+    """
+    Upsert the sheet_tabs row and return its id.
+
+    Raises instead of returning None so failures are never memoized by
+    _resolve_sheet_tab_id.
+    """
+    # Single round-trip: relies on the unique (spreadsheet_id, sheet_title) constraint.
+    created = (
+      self._client.table("sheet_tabs")
+      .upsert(
+        {
+          "spreadsheet_id": spreadsheet_id,
+          "spreadsheet_url": spreadsheet_url,
+          "sheet_title": sheet_title,
+        },
+        on_conflict="spreadsheet_id,sheet_title",
+        ignore_duplicates=False,
+      )
+      .execute()
+    )
+    cdata = getattr(created, "data", None)
+    tab_id = cdata[0].get("id") if isinstance(cdata, list) and cdata else None
+    if not tab_id:
+      raise LookupError(f"sheet_tabs upsert returned no id for {spreadsheet_id}/{sheet_title}")
+    return tab_id
 
   @staticmethod
   def _extract_spreadsheet_id(value: str) -> Optional[str]:
@@ -200,14 +229,6 @@ class ConversationLogger:
     if not value:
       return None
     if value.startswith("http://") or value.startswith("https://"):
-      marker = "/d/"
-      try:
-        start = value.index(marker) + len(marker)
-        rest = value[start:]
-        end = rest.find("/")
-        if end == -1:
-          return rest
-        return rest[: end]
-      except ValueError:
-        return None
+      match = _SHEET_ID_RE.search(value)
+      return match.group(1) if match else None
     return value
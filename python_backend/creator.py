@@ -1,6 +1,14 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, model_validator
 
 from .llm import LLMClient, PROMPTS
 from .logging_config import get_logger
@@ -9,6 +17,60 @@ from .utils import column_to_letter
 
 logger = get_logger(__name__)
 
+_MAX_POPULATE_WORKERS = 8
+_README_SHEET = "README"
+_PLAN_CACHE_MAX = 128
+
+
+# LLMs emit headers such as years as bare numbers; those are valid names.
+_PLAN_MODEL_CONFIG = ConfigDict(coerce_numbers_to_str=True)
+
+
+class PlanColumn(BaseModel):
+  model_config = _PLAN_MODEL_CONFIG
+
+  name: str = Field(min_length=1)
+  # Advisory only; nothing downstream reads it, so any value is accepted
+  type: Any = None
+
+
+class PlanSheet(BaseModel):
+  model_config = _PLAN_MODEL_CONFIG
+
+  name: str = Field(min_length=1)
+  columns: List[PlanColumn] = Field(min_length=1)
+  exampleRows: Optional[List[List[Any]]] = None
+
+  @model_validator(mode="after")
+  def _rows_match_columns(self) -> "PlanSheet":
+    mismatches = [
+      f"exampleRow {row_num} has {len(row)} values but {len(self.columns)} columns defined"
+      for row_num, row in enumerate(self.exampleRows or [], start=1)
+      if len(row) != len(self.columns)
+    ]
+    if mismatches:
+      raise ValueError("; ".join(mismatches))
+    return self
+
+
+class SheetPlan(BaseModel):
+  """Shape of the plan returned by the SHEET_CREATION prompt. Only used for validation."""
+
+  model_config = _PLAN_MODEL_CONFIG
+
+  title: str = Field(min_length=1)
+  sheets: List[PlanSheet] = Field(min_length=1)
+  documentation: Optional[str] = None
+
+
+def _format_plan_error(err: Dict[str, Any]) -> str:
+  # Render pydantic's loc tuple with 1-based indices, e.g. "sheets[1].columns[2].name".
+  path = ""
+  for part in err.get("loc", ()):
+    path += f"[{part + 1}]" if isinstance(part, int) else (f".{part}" if path else str(part))
+  message = err.get("msg", "invalid value")
+  return f"Plan {path}: {message}" if path else f"Plan: {message}"
+
 
 class SheetCreator:
   """
@@ -19,6 +81,9 @@ class SheetCreator:
   def __init__(self, sheets_client: ServiceAccountSheetsClient, llm_client: LLMClient) -> None:
     self.sheets_client = sheets_client
     self.llm_client = llm_client
+    # Validated plans keyed by normalized prompt + constraints; repeat requests skip the LLM.
+    self._plan_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    self._plan_cache_lock = threading.Lock()
 
   def create(self, request: Dict[str, Any]) -> Dict[str, Any]:
     errors: List[str] = []
@@ -27,11 +92,9 @@ class SheetCreator:
     try:
       logger.info(f"Creating spreadsheet with prompt: {request.get('prompt', '')[:100]}...")
 
-      plan = self._generate_plan(request)
+      plan, validation_errors = self._generate_plan(request)
       logger.debug(f"Generated plan with {len(plan.get('sheets', []))} sheets")
 
-      # Validate plan structure
-      validation_errors = self._validate_plan(plan)
       if validation_errors:
         logger.warning(f"Plan validation failed with {len(validation_errors)} errors")
         for error in validation_errors:
@@ -42,10 +105,10 @@ class SheetCreator:
           "errors": validation_errors,
         }
 
-      spreadsheet_id = self._create_spreadsheet(plan)
+      spreadsheet_id, sheet_ids = self._create_spreadsheet(plan)
       logger.info(f"Created spreadsheet: {spreadsheet_id}")
 
-      populate_errors = self._populate_spreadsheet(spreadsheet_id, plan)
+      populate_errors = self._populate_spreadsheet(spreadsheet_id, plan, sheet_ids)
 
       if populate_errors:
         logger.warning(f"Encountered {len(populate_errors)} errors while populating spreadsheet")
@@ -53,13 +116,13 @@ class SheetCreator:
           logger.warning(f"  - {error}")
         errors.extend(populate_errors)
 
-      if len(errors) == 0:
+      if not errors:
         logger.info(f"Successfully created and populated spreadsheet: {spreadsheet_id}")
       else:
         logger.error(f"Spreadsheet created but with {len(errors)} errors: {spreadsheet_id}")
 
       return {
-        "success": len(errors) == 0,
+        "success": not errors,
         "spreadsheetId": spreadsheet_id,
         "spreadsheetUrl": f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}",
         "plan": plan,
@@ -77,7 +140,8 @@ class SheetCreator:
 
   # --- planning ---
 
-  def _generate_plan(self, request: Dict[str, Any]) -> Dict[str, Any]:
+  def _generate_plan(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """Return the plan for a request together with its validation errors."""
     prompt = request["prompt"]
     constraints = request.get("constraints") or {}
 
@@ -90,172 +154,177 @@ class SheetCreator:
       parts.append(f"Limit example rows to {constraints['maxExampleRows']}")
 
     constraints_str = "\n".join(parts) if parts else None
+
+    cache_key = self._plan_cache_key(prompt, constraints_str)
+    with self._plan_cache_lock:
+      cached = self._plan_cache.get(cache_key)
+      if cached is not None:
+        self._plan_cache.move_to_end(cache_key)
+    if cached is not None:
+      logger.info("Reusing cached spreadsheet plan for an identical request")
+      return copy.deepcopy(cached), []
+
     llm_prompt = PROMPTS.SHEET_CREATION.user(prompt, constraints_str)
 
     response = self.llm_client.chat_json(
       [
-        {"role": "system", "content": PROMPTS.SHEET_CREATION.system},
+        PROMPTS.SHEET_CREATION.system_message,
         {"role": "user", "content": llm_prompt},
       ],
       overrides={"temperature": 0.5},
+      # Plans run to tens of KB; streaming starts consuming them as they are generated
+      stream=True,
     )
 
-    return response
+    # Only plans that pass validation are worth replaying
+    validation_errors = self._validate_plan(response)
+    if not validation_errors:
+      with self._plan_cache_lock:
+        self._plan_cache[cache_key] = copy.deepcopy(response)
+        self._plan_cache.move_to_end(cache_key)
+        while len(self._plan_cache) > _PLAN_CACHE_MAX:
+          self._plan_cache.popitem(last=False)
+
+    return response, validation_errors
+
+  @staticmethod
+  def _plan_cache_key(prompt: str, constraints_str: Optional[str]) -> str:
+    # Case and whitespace differences don't change what the user asked for
+    normalized = " ".join(prompt.split()).casefold()
+    return hashlib.sha256(f"{normalized}\0{constraints_str or ''}".encode("utf-8")).hexdigest()
 
   def _validate_plan(self, plan: Dict[str, Any]) -> List[str]:
     """
     Validate the LLM-generated plan structure.
     Returns a list of error messages (empty list if valid).
     """
-    errors: List[str] = []
-
-    if not isinstance(plan, dict):
-      errors.append("Plan must be a dictionary")
-      return errors
-
-    if not plan.get("title"):
-      errors.append("Plan must include a 'title' field")
-
-    sheets = plan.get("sheets")
-    if not sheets or not isinstance(sheets, list) or len(sheets) == 0:
-      errors.append("Plan must include at least one sheet in 'sheets' array")
-      return errors
-
-    for idx, sheet in enumerate(sheets):
-      sheet_num = idx + 1
-
-      if not isinstance(sheet, dict):
-        errors.append(f"Sheet {sheet_num} must be a dictionary")
-        continue
-
-      if not sheet.get("name"):
-        errors.append(f"Sheet {sheet_num} must have a 'name' field")
-
-      columns = sheet.get("columns")
-      if not columns or not isinstance(columns, list):
-        errors.append(f"Sheet {sheet_num} must have a 'columns' array")
-        continue
-
-      if len(columns) == 0:
-        errors.append(f"Sheet {sheet_num} must have at least one column")
-
-      for col_idx, col in enumerate(columns):
-        col_num = col_idx + 1
-        if not isinstance(col, dict):
-          errors.append(f"Sheet {sheet_num}, column {col_num} must be a dictionary")
-          continue
-
-        if not col.get("name"):
-          errors.append(f"Sheet {sheet_num}, column {col_num} must have a 'name' field")
-
-      example_rows = sheet.get("exampleRows")
-      if example_rows is not None:
-        if not isinstance(example_rows, list):
-          errors.append(f"Sheet {sheet_num} 'exampleRows' must be an array")
-        else:
-          # Validate each row has the correct number of columns
-          for row_idx, row in enumerate(example_rows):
-            row_num = row_idx + 1
-            if not isinstance(row, list):
-              errors.append(f"Sheet {sheet_num}, exampleRow {row_num} must be an array")
-            elif len(row) != len(columns):
-              errors.append(
-                f"Sheet {sheet_num}, exampleRow {row_num} has {len(row)} values but {len(columns)} columns defined"
-              )
-
-    return errors
+    try:
+      SheetPlan.model_validate(plan)
+    except ValidationError as exc:
+      return [_format_plan_error(err) for err in exc.errors()]
+    return []
 
   # --- spreadsheet creation / population ---
 
-  def _create_spreadsheet(self, plan: Dict[str, Any]) -> str:
+  def _create_spreadsheet(self, plan: Dict[str, Any]) -> Tuple[str, Dict[str, int]]:
+    """Create the spreadsheet and return its id with a {sheet title: sheetId} map."""
     sheet_titles = [s.get("name") for s in plan.get("sheets", [])]
+    # Create the README tab up front so its rows can ride along in the values batch.
+    if plan.get("documentation") and _README_SHEET not in sheet_titles:
+      sheet_titles.append(_README_SHEET)
     title = plan.get("title", "Sheet Mangler Spreadsheet")
-    return self.sheets_client.create_spreadsheet(title, sheet_titles)
-
-  def _populate_spreadsheet(self, spreadsheet_id: str, plan: Dict[str, Any]) -> List[str]:
+    return self.sheets_client.create_spreadsheet_with_sheet_ids(title, sheet_titles)
+
+  def _populate_spreadsheet(
+    self,
+    spreadsheet_id: str,
+    plan: Dict[str, Any],
+    sheet_ids: Dict[str, int],
+  ) -> List[str]:
     """
     Populate the spreadsheet with data from the plan.
+
+    Header, example-row and README writes for every sheet go out in one
+    values.batchUpdate, and header formatting in one spreadsheets.batchUpdate.
     Returns a list of error messages (empty if successful).
     """
     errors: List[str] = []
+    sheets = plan.get("sheets", [])
+    value_ranges: List[Dict[str, Any]] = []
 
-    for idx, sheet in enumerate(plan.get("sheets", [])):
+    for idx, sheet in enumerate(sheets):
       sheet_num = idx + 1
       sheet_name = sheet.get("name", f"Sheet{sheet_num}")
 
-      try:
-        columns = sheet.get("columns") or []
-        headers = [c.get("name") for c in columns]
+      columns = sheet.get("columns") or []
+      headers = [c.get("name") for c in columns]
 
-        if not headers:
-          errors.append(f"Sheet '{sheet_name}' has no headers to write")
-          continue
-
-        header_range = f"{sheet_name}!A1:{column_to_letter(len(headers))}1"
-        self.sheets_client.write_range(spreadsheet_id, header_range, [headers])
-
-        example_rows = sheet.get("exampleRows") or []
-        if example_rows:
-          row_count = len(example_rows)
-          data_range = f"{sheet_name}!A2:{column_to_letter(len(columns))}{1 + row_count}"
-
-          try:
-            self.sheets_client.write_range(
-              spreadsheet_id,
-              data_range,
-              example_rows,
-              value_input_option="USER_ENTERED",
-            )
-          except Exception as exc:
-            errors.append(f"Failed to write data to sheet '{sheet_name}': {str(exc)}")
+      if not headers:
+        errors.append(f"Sheet '{sheet_name}' has no headers to write")
+        continue
 
-        # Apply formatting (best effort - don't fail if this errors)
-        try:
-          self._apply_formatting(spreadsheet_id, sheet)
-        except Exception as exc:
-          errors.append(f"Failed to format sheet '{sheet_name}': {str(exc)}")
+      # Headers come from columns, so one letter bounds both the header and data ranges
+      last_col = column_to_letter(len(headers))
+      value_ranges.append({"range": f"{sheet_name}!A1:{last_col}1", "values": [headers]})
 
-      except Exception as exc:
-        errors.append(f"Failed to populate sheet '{sheet_name}': {str(exc)}")
+      example_rows = sheet.get("exampleRows") or []
+      if example_rows:
+        row_count = len(example_rows)
+        value_ranges.append(
+          {
+            "range": f"{sheet_name}!A2:{last_col}{1 + row_count}",
+            "values": example_rows,
+          }
+        )
 
     # Add documentation sheet if present (best effort)
     documentation = plan.get("documentation")
     if documentation:
-      try:
-        self._add_documentation_sheet(spreadsheet_id, documentation)
-      except Exception as exc:
-        errors.append(f"Failed to add documentation sheet: {str(exc)}")
+      if any(sheet.get("name") == _README_SHEET for sheet in sheets):
+        errors.append(f"Failed to add documentation sheet: a sheet named '{_README_SHEET}' is already in the plan")
+      else:
+        value_ranges.append({"range": f"{_README_SHEET}!A1", "values": self._documentation_rows(documentation)})
+
+    # The value writes and header formatting touch disjoint parts of the spreadsheet,
+    # so their round-trips are overlapped. Each is best effort.
+    tasks: List[Tuple[str, Callable[[], Any]]] = []
+    if value_ranges:
+      tasks.append(("Failed to write sheet data", partial(self.sheets_client.batch_update, spreadsheet_id, value_ranges)))
+
+    format_requests = self._build_format_requests(sheets, sheet_ids)
+    if format_requests:
+      tasks.append(
+        (
+          "Failed to format sheets",
+          partial(self.sheets_client.batch_update_spreadsheet, spreadsheet_id, format_requests),
+        )
+      )
+
+    if tasks:
+      with ThreadPoolExecutor(max_workers=min(_MAX_POPULATE_WORKERS, len(tasks))) as pool:
+        futures = [(label, pool.submit(task)) for label, task in tasks]
+        for label, future in futures:
+          try:
+            future.result()
+          except Exception as exc:
+            errors.append(f"{label}: {str(exc)}")
 
     return errors
 
-  def _apply_formatting(self, spreadsheet_id: str, sheet: Dict[str, Any]) -> None:
-    metadata = self.sheets_client.get_spreadsheet_metadata(spreadsheet_id)
-    sheet_meta = next(
-      (s for s in metadata.get("sheets", []) if s.get("title") == sheet.get("name")),
-      None,
-    )
-    if not sheet_meta:
-      return
-
-    sheet_id = sheet_meta.get("sheetId")
-    columns = sheet.get("columns") or []
-
-    self.sheets_client.format_range(
-      spreadsheet_id,
-      sheet_id,
-      start_row=0,
-      end_row=1,
-      start_col=0,
-      end_col=len(columns),
-      cell_format={
-        "textFormat": {"bold": True},
-        "backgroundColor": {"red": 0.9, "green": 0.9, "blue": 0.9},
-      },
-    )
+  @staticmethod
+  def _build_format_requests(sheets: List[Dict[str, Any]], sheet_ids: Dict[str, int]) -> List[Dict[str, Any]]:
+    """Build the header repeatCell request for each planned sheet."""
+    requests: List[Dict[str, Any]] = []
+    for sheet in sheets:
+      sheet_id = sheet_ids.get(sheet.get("name"))
+      columns = sheet.get("columns") or []
+      if sheet_id is None or not columns:
+        continue
+      requests.append(
+        {
+          "repeatCell": {
+            "range": {
+              "sheetId": sheet_id,
+              "startRowIndex": 0,
+              "endRowIndex": 1,
+              "startColumnIndex": 0,
+              "endColumnIndex": len(columns),
+            },
+            "cell": {
+              "userEnteredFormat": {
+                "textFormat": {"bold": True},
+                "backgroundColor": {"red": 0.9, "green": 0.9, "blue": 0.9},
+              }
+            },
+            "fields": "userEnteredFormat",
+          }
+        }
+      )
+    return requests
 
-  def _add_documentation_sheet(self, spreadsheet_id: str, documentation: str) -> None:
-    self.sheets_client.add_sheet(spreadsheet_id, "README")
-    lines = [[line] for line in documentation.split("\n")]
-    self.sheets_client.write_range(spreadsheet_id, "README!A1", lines)
+  @staticmethod
+  def _documentation_rows(documentation: str) -> List[List[str]]:
+    # One row per line keeps the README readable; splitlines also drops the trailing empty row
+    return [[line] for line in documentation.splitlines()]
 
 
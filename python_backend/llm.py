@@ -1,17 +1,181 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
+import random
+import re
+import threading
 import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
 
 import httpx
 
 from .logging_config import get_logger
+from .utils import dump_json_bytes, load_json
+
+try:
+  import h2  # noqa: F401 - enables HTTP/2 in httpx
+  _HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - falls back to pooled HTTP/1.1
+  _HTTP2_AVAILABLE = False
 
 logger = get_logger(__name__)
 
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+# The only characters that change bracket depth or string state
+_JSON_STRUCTURE_RE = re.compile(r'[\\"{}\[\]]')
+
+# Rate limits and upstream hiccups are worth another try; other 4xx are not
+_RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+_MAX_RETRY_DELAY = 30.0
+
+_T = TypeVar("_T")
+
+
+class _RateLimitState:
+  """
+  Request headroom as last reported by the provider's rate-limit headers.
+
+  Lets the client pause before a request that would almost certainly be
+  rejected with a 429, instead of paying the round trip to find out.
+  """
+
+  def __init__(self) -> None:
+    self.requests_limit: Optional[int] = None
+    self.requests_remaining: Optional[int] = None
+    self.reset_at = 0.0
+    self._lock = threading.Lock()
+
+  def update(self, response: httpx.Response) -> None:
+    headers = response.headers
+    limit = _header_int(headers, "x-ratelimit-limit-requests", "x-ratelimit-limit")
+    remaining = _header_int(headers, "x-ratelimit-remaining-requests", "x-ratelimit-remaining")
+    reset_at = _header_reset_at(headers)
+    if response.status_code == 429:
+      remaining = 0
+      retry_after = _header_float(headers, "retry-after")
+      if retry_after is not None:
+        reset_at = time.time() + retry_after
+
+    with self._lock:
+      if limit is not None:
+        self.requests_limit = limit
+      if remaining is not None:
+        self.requests_remaining = remaining
+      if reset_at is not None:
+        self.reset_at = reset_at
+
+  def wait_seconds(self) -> float:
+    """Seconds to hold off before the next request; 0 when there is headroom."""
+    with self._lock:
+      remaining = self.requests_remaining
+      if remaining is None:
+        return 0.0
+      wait = self.reset_at - time.time()
+      if wait <= 0:
+        return 0.0
+      # Nearly exhausted: at most two requests or under 10% of the window left
+      low = remaining <= 2 or (self.requests_limit is not None and remaining < self.requests_limit * 0.1)
+      if not low:
+        return 0.0
+      # One caller waits out the window; the next one sees fresh headers
+      self.requests_remaining = None
+      return min(wait, _MAX_RETRY_DELAY)
+
+
+class _AdmissionController:
+  """
+  AIMD bound on in-flight async completions.
+
+  The limit grows by `increase` after every window of calls whose mean
+  latency stays within target, and is multiplied by `decrease` when a
+  window runs slow or the provider pushes back (429/502).
+
+  Only achat() and the achat_* helpers built on it are gated; nothing in
+  the backend calls them yet, so the sync chat() paths run unbounded.
+  """
+
+  def __init__(
+    self,
+    initial: float = 8.0,
+    minimum: float = 1.0,
+    maximum: float = 50.0,
+    increase: float = 0.5,
+    decrease: float = 0.5,
+    target_ms: float = 30_000.0,
+    window: int = 10,
+  ) -> None:
+    self.limit = initial
+    self.minimum = minimum
+    self.maximum = maximum
+    self.increase = increase
+    self.decrease = decrease
+    self.target_ms = target_ms
+    self.window = window
+    self._in_flight = 0
+    self._latencies: List[float] = []
+    self._cond = asyncio.Condition()
+
+  async def acquire(self) -> None:
+    async with self._cond:
+      await self._cond.wait_for(lambda: self._in_flight < int(self.limit))
+      self._in_flight += 1
+
+  async def release(self, duration_ms: Optional[float], throttled: bool = False) -> None:
+    """
+    Free a slot. duration_ms is None when no response arrived (cancelled or
+    transport error); such calls say nothing about provider load.
+    """
+    async with self._cond:
+      self._in_flight -= 1
+      if throttled:
+        self._shrink()
+      elif duration_ms is not None:
+        self._latencies.append(duration_ms)
+        if len(self._latencies) >= self.window:
+          if sum(self._latencies) / len(self._latencies) <= self.target_ms:
+            self.limit = min(self.maximum, self.limit + self.increase)
+          else:
+            self._shrink()
+          self._latencies.clear()
+      self._cond.notify_all()
+
+  def _shrink(self) -> None:
+    self.limit = max(self.minimum, self.limit * self.decrease)
+    self._latencies.clear()
+
+
+def _header_float(headers: httpx.Headers, *names: str) -> Optional[float]:
+  for name in names:
+    value = headers.get(name)
+    if value is None:
+      continue
+    try:
+      return float(value)
+    except ValueError:
+      continue
+  return None
+
+
+def _header_int(headers: httpx.Headers, *names: str) -> Optional[int]:
+  value = _header_float(headers, *names)
+  return int(value) if value is not None else None
+
+
+def _header_reset_at(headers: httpx.Headers) -> Optional[float]:
+  """Window reset as a unix timestamp; OpenRouter reports epoch milliseconds."""
+  value = _header_float(headers, "x-ratelimit-reset-requests", "x-ratelimit-reset")
+  if value is None:
+    return None
+  if value > 1e12:
+    return value / 1000.0
+  if value > 1e9:
+    return value
+  # Small values are a relative number of seconds
+  return time.time() + value
+
 
 class LLMClient:
   """
@@ -27,6 +191,9 @@ class LLMClient:
     temperature: float = 0.7,
     max_tokens: int = 4000,
     headers: Optional[Dict[str, str]] = None,
+    max_retries: int = 3,
+    base_delay: float = 1.0,
+    jitter: float = 0.5,
   ) -> None:
     self.api_key = api_key
     self.model = model
@@ -34,6 +201,77 @@ class LLMClient:
     self.temperature = temperature
     self.max_tokens = max_tokens
     self.headers = headers or {}
+    self.max_retries = max_retries
+    self.base_delay = base_delay
+    self.jitter = jitter
+    self._http: Optional[httpx.Client] = None
+    self._http_lock = threading.Lock()
+    self._async_http: Optional[httpx.AsyncClient] = None
+    self._admission: Optional[_AdmissionController] = None
+    self._rate_limit = _RateLimitState()
+
+  def _get_http(self) -> httpx.Client:
+    """
+    Return this client's pooled HTTP connection to the LLM provider.
+
+    Reusing one httpx.Client keeps the TLS connection alive between calls
+    instead of paying a fresh handshake per completion.
+    """
+    http = self._http
+    if http is None:
+      with self._http_lock:
+        if self._http is None:
+          # Auth and OpenRouter attribution headers never change, so they live on the client
+          self._http = httpx.Client(
+            base_url=self.base_url,
+            headers=self._build_headers(),
+            http2=_HTTP2_AVAILABLE,
+            timeout=60.0,
+            # Idle connections are kept just under the provider's ~90s idle timeout
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=85.0),
+          )
+        http = self._http
+    return http
+
+  def _get_async_http(self) -> httpx.AsyncClient:
+    """
+    Return the pooled async HTTP client used by the achat* methods.
+
+    Async clients are bound to the event loop that first uses them; the API
+    runs a single loop, so one lazily built client serves every request.
+    """
+    if self._async_http is None:
+      self._async_http = httpx.AsyncClient(
+        base_url=self.base_url,
+        headers=self._build_headers(),
+        http2=_HTTP2_AVAILABLE,
+        timeout=60.0,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=85.0),
+      )
+      # Loop-bound like the client, so it is created and discarded alongside it
+      self._admission = _AdmissionController()
+    return self._async_http
+
+  def close(self) -> None:
+    """Close the pooled connection; a later call transparently opens a new one."""
+    with self._http_lock:
+      if self._http is not None:
+        self._http.close()
+        self._http = None
+
+  async def aclose(self) -> None:
+    """Close both the async and the sync connection pools."""
+    if self._async_http is not None:
+      http, self._async_http = self._async_http, None
+      self._admission = None
+      await http.aclose()
+    self.close()
+
+  def __enter__(self) -> "LLMClient":
+    return self
+
+  def __exit__(self, *exc_info: Any) -> None:
+    self.close()
 
   def _build_headers(self) -> Dict[str, str]:
     base = {
@@ -43,104 +281,315 @@ class LLMClient:
     base.update(self.headers)
     return base
 
-  def chat(
+  def _build_payload(
     self,
     messages: List[Dict[str, str]],
-    overrides: Optional[Dict[str, Any]] = None,
+    overrides: Optional[Dict[str, Any]],
   ) -> Dict[str, Any]:
-    """
-    Send a chat completion request and return the raw JSON response.
-    """
     overrides = overrides or {}
     model = overrides.get("model", self.model)
-    temperature = overrides.get("temperature", self.temperature)
     max_tokens = overrides.get("maxTokens", self.max_tokens)
 
-    payload = {
+    logger.debug(
+        f"LLM API call: model={model}, messages={len(messages)}, max_tokens={max_tokens}",
+        extra={"model": model, "message_count": len(messages), "max_tokens": max_tokens}
+    )
+
+    return {
       "model": model,
       "messages": messages,
-      "temperature": temperature,
+      "temperature": overrides.get("temperature", self.temperature),
       "max_tokens": max_tokens,
     }
 
-    url = f"{self.base_url}/chat/completions"
+  def _retry_delay(self, attempt: int, exc: httpx.HTTPError) -> Optional[float]:
+    """
+    Seconds to wait before retrying a failed request, or None when the error is
+    final. Exponential backoff with jitter, deferring to Retry-After when sent.
+    """
+    if attempt >= self.max_retries:
+      return None
+    retry_after = None
+    if isinstance(exc, httpx.HTTPStatusError):
+      if exc.response.status_code not in _RETRYABLE_STATUS:
+        return None
+      retry_after = exc.response.headers.get("Retry-After")
+    elif not isinstance(exc, httpx.RequestError):
+      return None
+
+    try:
+      delay = float(retry_after)
+    except (TypeError, ValueError):
+      delay = self.base_delay * (2 ** attempt) + random.uniform(0, self.jitter)
+    delay = min(max(delay, 0.0), _MAX_RETRY_DELAY)
+
+    logger.warning(
+        f"LLM API call failed ({exc}), retrying in {delay:.1f}s",
+        extra={"attempt": attempt + 1, "delay_s": round(delay, 2)}
+    )
+    return delay
 
-    logger.debug(
-        f"LLM API call: model={model}, messages={len(messages)}, max_tokens={max_tokens}",
-        extra={"model": model, "message_count": len(messages), "max_tokens": max_tokens}
+  def _throttle_delay(self) -> float:
+    wait = self._rate_limit.wait_seconds()
+    if wait:
+      logger.info(
+          f"LLM API rate limit nearly exhausted, pausing {wait:.1f}s",
+          extra={"delay_s": round(wait, 2)}
+      )
+    return wait
+
+  def _with_retries(self, send: Callable[[], _T]) -> _T:
+    attempt = 0
+    while True:
+      wait = self._throttle_delay()
+      if wait:
+        time.sleep(wait)
+      try:
+        return send()
+      except httpx.HTTPError as exc:
+        delay = self._retry_delay(attempt, exc)
+        if delay is None:
+          raise
+      time.sleep(delay)
+      attempt += 1
+
+  async def _awith_retries(self, send: Callable[[], Awaitable[_T]]) -> _T:
+    attempt = 0
+    while True:
+      wait = self._throttle_delay()
+      if wait:
+        await asyncio.sleep(wait)
+      try:
+        return await send()
+      except httpx.HTTPError as exc:
+        delay = self._retry_delay(attempt, exc)
+        if delay is None:
+          raise
+      await asyncio.sleep(delay)
+      attempt += 1
+
+  def _request_failed(self, exc: httpx.RequestError, model: str, start_time: float) -> RuntimeError:
+    duration_ms = int((time.time() - start_time) * 1000)
+    logger.error(
+        f"LLM API request failed after {duration_ms}ms: {str(exc)}",
+        exc_info=True,
+        extra={"model": model, "duration_ms": duration_ms}
+    )
+    return RuntimeError(f"LLM API request failed: {exc}")
+
+  def _status_failed(self, exc: httpx.HTTPStatusError, model: str, start_time: float) -> RuntimeError:
+    duration_ms = int((time.time() - start_time) * 1000)
+    logger.error(
+        f"LLM API error {exc.response.status_code} after {duration_ms}ms",
+        exc_info=True,
+        extra={
+            "model": model,
+            "status_code": exc.response.status_code,
+            "duration_ms": duration_ms,
+            "response_body": exc.response.text[:500]  # Truncate long responses
+        }
+    )
+    return RuntimeError(f"LLM API returned error {exc.response.status_code}: {exc.response.text}")
+
+  def _log_success(self, response: httpx.Response, model: str, start_time: float) -> None:
+    duration_ms = int((time.time() - start_time) * 1000)
+    logger.info(
+        f"LLM API success: {duration_ms}ms",
+        extra={
+            "model": model,
+            "duration_ms": duration_ms,
+            "status_code": response.status_code,
+            "http_version": response.http_version,
+        }
     )
 
+  def chat(
+    self,
+    messages: List[Dict[str, str]],
+    overrides: Optional[Dict[str, Any]] = None,
+  ) -> Dict[str, Any]:
+    """
+    Send a chat completion request and return the raw JSON response.
+    """
+    payload = self._build_payload(messages, overrides)
+    model = payload["model"]
+
+    body = dump_json_bytes(payload)
+
+    def send() -> httpx.Response:
+      response = self._get_http().post("/chat/completions", content=body)
+      self._rate_limit.update(response)
+      response.raise_for_status()
+      return response
+
     start_time = time.time()
     try:
-      response = httpx.post(url, headers=self._build_headers(), json=payload, timeout=60.0)
+      response = self._with_retries(send)
+    except httpx.RequestError as exc:
+      raise self._request_failed(exc, model, start_time) from exc
+    except httpx.HTTPStatusError as exc:
+      raise self._status_failed(exc, model, start_time) from exc
+    self._log_success(response, model, start_time)
+
+    return load_json(response.content)
+
+  async def achat(
+    self,
+    messages: List[Dict[str, str]],
+    overrides: Optional[Dict[str, Any]] = None,
+  ) -> Dict[str, Any]:
+    """
+    Async counterpart of chat(), sharing the same payload and error handling.
+    """
+    payload = self._build_payload(messages, overrides)
+    model = payload["model"]
+
+    body = dump_json_bytes(payload)
+
+    async def send() -> httpx.Response:
+      # Take the client and its controller together, before any await, so an
+      # aclose() during the request cannot leave this call without either
+      http, admission = self._get_async_http(), self._admission
+      await admission.acquire()
+      sent_at = time.time()
+      duration_ms: Optional[float] = None
+      throttled = False
+      try:
+        response = await http.post("/chat/completions", content=body)
+        duration_ms = (time.time() - sent_at) * 1000
+        throttled = response.status_code in (429, 502)
+      finally:
+        await admission.release(duration_ms, throttled)
+      self._rate_limit.update(response)
       response.raise_for_status()
-      duration_ms = int((time.time() - start_time) * 1000)
+      return response
 
-      logger.info(
-          f"LLM API success: {duration_ms}ms",
-          extra={"model": model, "duration_ms": duration_ms, "status_code": response.status_code}
-      )
+    start_time = time.time()
+    try:
+      response = await self._awith_retries(send)
     except httpx.RequestError as exc:
-      duration_ms = int((time.time() - start_time) * 1000)
-      logger.error(
-          f"LLM API request failed after {duration_ms}ms: {str(exc)}",
-          exc_info=True,
-          extra={"model": model, "duration_ms": duration_ms}
-      )
-      raise RuntimeError(f"LLM API request failed: {exc}") from exc
+      raise self._request_failed(exc, model, start_time) from exc
     except httpx.HTTPStatusError as exc:
-      duration_ms = int((time.time() - start_time) * 1000)
-      logger.error(
-          f"LLM API error {exc.response.status_code} after {duration_ms}ms",
-          exc_info=True,
-          extra={
-              "model": model,
-              "status_code": exc.response.status_code,
-              "duration_ms": duration_ms,
-              "response_body": exc.response.text[:500]  # Truncate long responses
-          }
-      )
-      raise RuntimeError(f"LLM API returned error {exc.response.status_code}: {exc.response.text}") from exc
+      raise self._status_failed(exc, model, start_time) from exc
+    self._log_success(response, model, start_time)
+
+    return load_json(response.content)
 
-    return response.json()
+  async def achat_batch(
+    self,
+    message_lists: List[List[Dict[str, str]]],
+    overrides: Optional[Dict[str, Any]] = None,
+  ) -> List[Dict[str, Any]]:
+    """Run independent completions concurrently; results keep the input order."""
+    return list(await asyncio.gather(*(self.achat(messages, overrides) for messages in message_lists)))
 
   def chat_text(
     self,
     messages: List[Dict[str, str]],
     overrides: Optional[Dict[str, Any]] = None,
   ) -> str:
-    data = self.chat(messages, overrides)
-    choices = data.get("choices") or []
-    if not choices:
-      raise RuntimeError("LLM API returned no choices")
-    content = choices[0].get("message", {}).get("content", "")
-    return content or ""
+    return _message_content(self.chat(messages, overrides))
+
+  async def achat_text(
+    self,
+    messages: List[Dict[str, str]],
+    overrides: Optional[Dict[str, Any]] = None,
+  ) -> str:
+    return _message_content(await self.achat(messages, overrides))
+
+  def chat_stream(
+    self,
+    messages: List[Dict[str, str]],
+    overrides: Optional[Dict[str, Any]] = None,
+  ) -> str:
+    """
+    Send a streaming (SSE) chat completion request and return the assembled
+    message content.
+
+    Deltas are read as they arrive, which makes time-to-first-token visible
+    in the logs. Provider errors sent inside the stream and malformed events
+    are raised as httpx errors, so they are retried and logged like failed
+    responses.
+    """
+    payload = self._build_payload(messages, overrides)
+    payload["stream"] = True
+    model = payload["model"]
+
+    body = dump_json_bytes(payload)
+    parts: List[str] = []
+    first_token_ms: Optional[int] = None
+
+    def send() -> httpx.Response:
+      nonlocal first_token_ms
+      # A retried stream starts over from the first delta
+      parts.clear()
+      first_token_ms = None
+      with self._get_http().stream("POST", "/chat/completions", content=body) as response:
+        self._rate_limit.update(response)
+        if response.is_error:
+          response.read()
+        response.raise_for_status()
+
+        for line in response.iter_lines():
+          # Blank separators and ": keep-alive" comments carry no data
+          if not line.startswith("data:"):
+            continue
+          data = line[5:].strip()
+          if data == "[DONE]":
+            break
+
+          try:
+            chunk = load_json(data)
+          except ValueError as exc:
+            raise httpx.DecodingError(f"Malformed SSE event: {data[:200]}", request=response.request) from exc
+          if not isinstance(chunk, dict):
+            raise httpx.DecodingError(f"Unexpected SSE event: {data[:200]}", request=response.request)
+          if chunk.get("error"):
+            raise _stream_error(response, chunk["error"])
+          choices = chunk.get("choices") or []
+          if not choices:
+            continue
+          piece = (choices[0].get("delta") or {}).get("content")
+          if piece:
+            if first_token_ms is None:
+              first_token_ms = int((time.time() - start_time) * 1000)
+            parts.append(piece)
+      return response
+
+    start_time = time.time()
+    try:
+      response = self._with_retries(send)
+    except httpx.RequestError as exc:
+      raise self._request_failed(exc, model, start_time) from exc
+    except httpx.HTTPStatusError as exc:
+      raise self._status_failed(exc, model, start_time) from exc
+
+    duration_ms = int((time.time() - start_time) * 1000)
+    logger.info(
+        f"LLM API stream success: {duration_ms}ms (first token {first_token_ms}ms)",
+        extra={
+            "model": model,
+            "duration_ms": duration_ms,
+            "first_token_ms": first_token_ms,
+            "status_code": response.status_code,
+        }
+    )
+
+    return "".join(parts)
 
   def _detect_json_truncation(self, json_str: str) -> bool:
     """
     Detect if a JSON string appears to be truncated.
     Returns True if truncation is detected.
     """
-    # Check for common truncation patterns
-    truncation_indicators = [
-      # Ends mid-key or mid-value
-      json_str.endswith('"'),
-      json_str.endswith(':'),
-      json_str.endswith(','),
-      # Unclosed brackets/braces
-      json_str.count('{') > json_str.count('}'),
-      json_str.count('[') > json_str.count(']'),
-      # Ends with incomplete structure
-      json_str.rstrip().endswith('",') and not json_str.rstrip().endswith('}'),
-    ]
-
-    return any(truncation_indicators)
+    return _detect_json_truncation(json_str)
 
   def chat_json(
     self,
     messages: List[Dict[str, str]],
     overrides: Optional[Dict[str, Any]] = None,
     max_retries: int = 1,
+    stream: bool = False,
   ) -> Any:
     """
     Send a request expecting a JSON response string. Handles the case where the
@@ -152,163 +601,271 @@ class LLMClient:
       messages: List of message dictionaries with 'role' and 'content'
       overrides: Optional overrides for LLM parameters
       max_retries: Number of times to retry if response is truncated (default: 1)
+      stream: Receive the completion over SSE via chat_stream (default: False)
     """
-    original_messages = messages.copy()
-
+    attempt_messages = messages
     for attempt in range(max_retries + 1):
-      content = self.chat_text(messages, overrides)
+      if stream:
+        content = self.chat_stream(attempt_messages, overrides)
+      else:
+        content = self.chat_text(attempt_messages, overrides)
+      try:
+        return _parse_llm_json(content, attempt, can_retry=attempt < max_retries)
+      except _RetryJson as retry:
+        attempt_messages = _with_retry_hint(messages, retry.hint)
 
-      # Validate that we got some content
-      if not content or not content.strip():
-        logger.error(
-          "LLM returned empty content when JSON was expected",
-          extra={"messages_count": len(messages), "attempt": attempt + 1}
-        )
-        raise RuntimeError(
-          "Failed to parse LLM response as JSON: Empty response received\n"
-          "This may indicate the LLM failed to generate output or hit a token limit.\n"
-          "Consider:\n"
-          "1. Simplifying your request\n"
-          "2. Reducing the amount of context provided\n"
-          "3. Breaking the task into smaller steps"
-        )
+    # If we get here, all retries failed
+    raise RuntimeError(
+      f"Failed to parse LLM response as JSON after {max_retries + 1} attempts\n"
+      f"Please simplify your request and try again"
+    )
 
-      json_str = content.strip()
+  async def achat_json(
+    self,
+    messages: List[Dict[str, str]],
+    overrides: Optional[Dict[str, Any]] = None,
+    max_retries: int = 1,
+  ) -> Any:
+    """Async counterpart of chat_json() with the same parsing and retry rules."""
+    attempt_messages = messages
+    for attempt in range(max_retries + 1):
+      content = await self.achat_text(attempt_messages, overrides)
+      try:
+        return _parse_llm_json(content, attempt, can_retry=attempt < max_retries)
+      except _RetryJson as retry:
+        attempt_messages = _with_retry_hint(messages, retry.hint)
 
-      # Check for response length issues
-      if len(content) > 15000:
-        logger.warning(
-          f"LLM response is very long ({len(content)} chars) - may hit token limits",
-          extra={"content_length": len(content), "attempt": attempt + 1}
-        )
+    raise RuntimeError(
+      f"Failed to parse LLM response as JSON after {max_retries + 1} attempts\n"
+      f"Please simplify your request and try again"
+    )
 
-      # Extract JSON from markdown code blocks if present
-      if "```" in json_str:
-        try:
-          # Look for ```json ... ``` or ``` ... ```
-          start = json_str.index("```")
-          end = json_str.rindex("```")
-          block = json_str[start + 3 : end]
-          # Strip optional language tag
-          if block.lstrip().startswith("json"):
-            block = block.lstrip()[4:]
-          json_str = block.strip()
-        except ValueError:
-          # Fallback to original content
-          pass
-
-      # Additional validation: check if response looks like JSON
-      if not (json_str.startswith("{") or json_str.startswith("[")):
-        logger.warning(
-          "LLM response doesn't start with { or [ - may not be valid JSON",
-          extra={"first_100_chars": json_str[:100]}
-        )
-        # Try to find the first { or [
-        for char in ["{", "["]:
-          if char in json_str:
-            start_idx = json_str.index(char)
-            logger.info(f"Found JSON start at position {start_idx}, extracting...")
-            json_str = json_str[start_idx:]
-            break
 
-      # Detect truncation before attempting to parse
-      if self._detect_json_truncation(json_str):
-        logger.warning(
-          f"Detected truncated JSON response on attempt {attempt + 1}",
-          extra={
-            "content_length": len(content),
-            "last_50_chars": json_str[-50:],
-            "attempt": attempt + 1
-          }
-        )
+def _stream_error(response: httpx.Response, error: Any) -> httpx.HTTPStatusError:
+  """
+  Turn an error event sent mid-stream (on an HTTP 200) into an HTTPStatusError.
 
-        if attempt < max_retries:
-          # Retry with instructions to simplify
-          logger.info("Retrying with simplified instructions...")
-          messages = original_messages.copy()
-
-          # Add simplification instruction to the last user message
-          if messages and messages[-1].get("role") == "user":
-            messages[-1]["content"] += (
-              "\n\nIMPORTANT: Keep your response concise. "
-              "Limit the number of actions and avoid repetitive formatting. "
-              "Focus on the essential structure only."
-            )
-          continue
-        else:
-          raise RuntimeError(
-            f"Failed to parse LLM response as JSON: Response appears truncated\n"
-            f"Response length: {len(content)} chars\n"
-            f"Last 100 chars: ...{json_str[-100:]}\n\n"
-            f"The response is too long. Please:\n"
-            f"1. Simplify your request to generate less data\n"
-            f"2. Break the task into smaller steps\n"
-            f"3. Reduce the number of rows/columns/actions requested"
-          )
+  OpenRouter reports the would-be HTTP status in the error's code; anything
+  else is treated as a 502 from upstream.
+  """
+  code = error.get("code") if isinstance(error, dict) else None
+  status = code if isinstance(code, int) and 400 <= code < 600 else 502
+  failed = httpx.Response(
+    status,
+    request=response.request,
+    content=dump_json_bytes({"error": error}),
+    headers={"content-type": "application/json"},
+  )
+  return httpx.HTTPStatusError(f"LLM API stream error: {error}", request=response.request, response=failed)
 
-      try:
-        parsed = json.loads(json_str)
 
-        # Validate that we got a meaningful structure
-        if isinstance(parsed, dict):
-          # Check for common required fields based on context
-          if "actions" in parsed and not isinstance(parsed["actions"], list):
-            logger.warning("Parsed JSON has 'actions' field but it's not a list")
+def _message_content(data: Dict[str, Any]) -> str:
+  choices = data.get("choices") or []
+  if not choices:
+    raise RuntimeError("LLM API returned no choices")
+  content = choices[0].get("message", {}).get("content", "")
+  return content or ""
 
-        logger.info(
-          f"Successfully parsed JSON response on attempt {attempt + 1}",
-          extra={"content_length": len(content)}
-        )
-        return parsed
-
-      except json.JSONDecodeError as exc:
-        # Enhanced error message with debugging info
-        logger.error(
-          f"JSON parsing failed on attempt {attempt + 1}: {exc}",
-          extra={
-            "error_line": exc.lineno,
-            "error_col": exc.colno,
-            "error_msg": exc.msg,
-            "content_length": len(content),
-            "json_str_length": len(json_str),
-            "attempt": attempt + 1
-          }
-        )
 
-        # If we have retries left and this looks like a length issue, retry
-        if attempt < max_retries and len(content) > 10000:
-          logger.info(f"Retrying due to large response ({len(content)} chars)...")
-          messages = original_messages.copy()
-
-          # Add simplification instruction to the last user message
-          if messages and messages[-1].get("role") == "user":
-            messages[-1]["content"] += (
-              "\n\nIMPORTANT: Keep your response SHORT and CONCISE. "
-              "Generate FEWER actions (maximum 5-10). "
-              "Avoid repetitive formatting actions. "
-              "Focus ONLY on the essential data structure."
-            )
-          continue
+def _scan_json(json_str: str) -> Tuple[bool, int]:
+  """
+  Single pass over a JSON document tracking bracket depth and string state.
 
-        # Provide detailed error message
-        error_context = json_str[max(0, exc.pos - 50):min(len(json_str), exc.pos + 50)]
-        raise RuntimeError(
-          f"Failed to parse LLM response as JSON after {attempt + 1} attempt(s): {exc}\n"
-          f"Error at line {exc.lineno}, column {exc.colno}: {exc.msg}\n"
-          f"Context around error: ...{error_context}...\n\n"
-          f"Response length: {len(content)} chars\n\n"
-          f"Suggestions:\n"
-          f"1. The LLM may have generated invalid JSON - try again\n"
-          f"2. The response is too long (current: {len(content)} chars) - simplify your request\n"
-          f"3. Break the task into smaller steps (e.g., create data first, format later)\n"
-          f"4. Reduce the number of rows/columns/actions requested"
-        ) from exc
+  Returns (truncated, consumed). truncated is True when the text ends inside
+  a string or an unclosed object/array; consumed is the index just past the
+  first complete top-level value, so trailing chatter can be cut off.
+  Brackets and quotes inside string literals are ignored.
+  """
+  depth = 0
+  in_string = False
+  skip_to = 0
+  for match in _JSON_STRUCTURE_RE.finditer(json_str):
+    pos = match.start()
+    if pos < skip_to:
+      continue
+    ch = match.group()
+    if in_string:
+      if ch == "\\":
+        skip_to = pos + 2
+      elif ch == '"':
+        in_string = False
+        if depth == 0:
+          return False, pos + 1
+    elif ch == '"':
+      in_string = True
+    elif ch == "{" or ch == "[":
+      depth += 1
+    elif ch == "}" or ch == "]":
+      depth -= 1
+      if depth <= 0:
+        return False, pos + 1
+  return in_string or depth > 0, len(json_str)
+
+
+def _detect_json_truncation(json_str: str) -> bool:
+  return _scan_json(json_str)[0]
+
+
+class _RetryJson(Exception):
+  """Raised by _parse_llm_json when another attempt with a simplification hint is worthwhile."""
+
+  def __init__(self, hint: str) -> None:
+    super().__init__(hint)
+    self.hint = hint
+
+
+def _with_retry_hint(messages: List[Dict[str, str]], hint: str) -> List[Dict[str, str]]:
+  """Copy of messages with the hint appended to the final user message."""
+  messages = list(messages)
+  if messages and messages[-1].get("role") == "user":
+    messages[-1] = {**messages[-1], "content": messages[-1]["content"] + hint}
+  return messages
+
+
+def _parse_llm_json(content: str, attempt: int, can_retry: bool) -> Any:
+  """
+  Parse one LLM completion as JSON, tolerating code fences and leading prose.
 
-    # If we get here, all retries failed
+  Raises _RetryJson when the response looks truncated or oversized and
+  can_retry is set, RuntimeError when it cannot be parsed.
+  """
+  # Validate that we got some content
+  if not content or not content.strip():
+    logger.error(
+      "LLM returned empty content when JSON was expected",
+      extra={"attempt": attempt + 1}
+    )
     raise RuntimeError(
-      f"Failed to parse LLM response as JSON after {max_retries + 1} attempts\n"
-      f"Please simplify your request and try again"
+      "Failed to parse LLM response as JSON: Empty response received\n"
+      "This may indicate the LLM failed to generate output or hit a token limit.\n"
+      "Consider:\n"
+      "1. Simplifying your request\n"
+      "2. Reducing the amount of context provided\n"
+      "3. Breaking the task into smaller steps"
+    )
+
+  # Check for response length issues
+  if len(content) > 15000:
+    logger.warning(
+      f"LLM response is very long ({len(content)} chars) - may hit token limits",
+      extra={"content_length": len(content), "attempt": attempt + 1}
+    )
+
+  # Fast path: most responses are bare JSON and parse without any cleanup
+  try:
+    parsed = load_json(content)
+  except json.JSONDecodeError:
+    pass
+  else:
+    logger.info(
+      f"Successfully parsed JSON response on attempt {attempt + 1}",
+      extra={"content_length": len(content)}
+    )
+    return parsed
+
+  # Extract JSON from a markdown code block (```json ... ``` or ``` ... ```) if present
+  fence = _FENCE_RE.search(content)
+  json_str = fence.group(1).strip() if fence else content.strip()
+
+  # Additional validation: check if response looks like JSON
+  if not (json_str.startswith("{") or json_str.startswith("[")):
+    logger.warning(
+      "LLM response doesn't start with { or [ - may not be valid JSON",
+      extra={"first_100_chars": json_str[:100]}
+    )
+    # Try to find the first { or [
+    for char in ["{", "["]:
+      if char in json_str:
+        start_idx = json_str.index(char)
+        logger.info(f"Found JSON start at position {start_idx}, extracting...")
+        json_str = json_str[start_idx:]
+        break
+
+  # Detect truncation before attempting to parse
+  truncated, consumed = _scan_json(json_str)
+  if truncated:
+    logger.warning(
+      f"Detected truncated JSON response on attempt {attempt + 1}",
+      extra={
+        "content_length": len(content),
+        "last_50_chars": json_str[-50:],
+        "attempt": attempt + 1
+      }
+    )
+
+    if can_retry:
+      # Retry with instructions to simplify
+      logger.info("Retrying with simplified instructions...")
+      raise _RetryJson(
+        "\n\nIMPORTANT: Keep your response concise. "
+        "Limit the number of actions and avoid repetitive formatting. "
+        "Focus on the essential structure only."
+      )
+    else:
+      raise RuntimeError(
+        f"Failed to parse LLM response as JSON: Response appears truncated\n"
+        f"Response length: {len(content)} chars\n"
+        f"Last 100 chars: ...{json_str[-100:]}\n\n"
+        f"The response is too long. Please:\n"
+        f"1. Simplify your request to generate less data\n"
+        f"2. Break the task into smaller steps\n"
+        f"3. Reduce the number of rows/columns/actions requested"
+      )
+
+  # Drop anything the model wrote after the closing bracket
+  json_str = json_str[:consumed]
+  try:
+    parsed = load_json(json_str)
+
+    # Validate that we got a meaningful structure
+    if isinstance(parsed, dict):
+      # Check for common required fields based on context
+      if "actions" in parsed and not isinstance(parsed["actions"], list):
+        logger.warning("Parsed JSON has 'actions' field but it's not a list")
+
+    logger.info(
+      f"Successfully parsed JSON response on attempt {attempt + 1}",
+      extra={"content_length": len(content)}
     )
+    return parsed
+
+  except json.JSONDecodeError as exc:
+    # Enhanced error message with debugging info
+    logger.error(
+      f"JSON parsing failed on attempt {attempt + 1}: {exc}",
+      extra={
+        "error_line": exc.lineno,
+        "error_col": exc.colno,
+        "error_msg": exc.msg,
+        "content_length": len(content),
+        "json_str_length": len(json_str),
+        "attempt": attempt + 1
+      }
+    )
+
+    # If we have retries left and this looks like a length issue, retry
+    if can_retry and len(content) > 10000:
+      logger.info(f"Retrying due to large response ({len(content)} chars)...")
+      raise _RetryJson(
+        "\n\nIMPORTANT: Keep your response SHORT and CONCISE. "
+        "Generate FEWER actions (maximum 5-10). "
+        "Avoid repetitive formatting actions. "
+        "Focus ONLY on the essential data structure."
+      )
+
+    # Provide detailed error message
+    error_context = json_str[max(0, exc.pos - 50):min(len(json_str), exc.pos + 50)]
+    raise RuntimeError(
+      f"Failed to parse LLM response as JSON after {attempt + 1} attempt(s): {exc}\n"
+      f"Error at line {exc.lineno}, column {exc.colno}: {exc.msg}\n"
+      f"Context around error: ...{error_context}...\n\n"
+      f"Response length: {len(content)} chars\n\n"
+      f"Suggestions:\n"
+      f"1. The LLM may have generated invalid JSON - try again\n"
+      f"2. The response is too long (current: {len(content)} chars) - simplify your request\n"
+      f"3. Break the task into smaller steps (e.g., create data first, format later)\n"
+      f"4. Reduce the number of rows/columns/actions requested"
+    ) from exc
 
 
 def _load_env_from_local_files() -> None:
@@ -386,6 +943,8 @@ def create_llm_client() -> LLMClient:
 
 
 # --- Prompt templates (ported from TypeScript) ---
+# Each template's system_message dict is built once at import and shared by
+# every call, so callers must not mutate it.
 
 
 class PROMPTS:
@@ -436,6 +995,8 @@ class PROMPTS:
       "Always provide specific cell ranges in A1 notation and decisive suggested fixes."
     )
 
+    system_message: Dict[str, str] = {"role": "system", "content": system}
+
     @staticmethod
     def user(context: str, sample_data: str) -> str:
       return f"# Sheet Context\n\n{context}\n\n# Sample Data\n\n{sample_data}\n\nAnalyze this sheet and identify any issues, errors, or anomalies. Return a JSON array of issues."
@@ -493,6 +1054,8 @@ class PROMPTS:
       "Remember: NO formatting actions. Only data and formulas."
     )
 
+    system_message: Dict[str, str] = {"role": "system", "content": system}
+
     @staticmethod
     def user(user_prompt: str, context: str) -> str:
       return f"# User Request\n\n{user_prompt}\n\n# Sheet Context\n\n{context}\n\nCreate a detailed action plan to fulfill the user's request. Return JSON only."
@@ -549,6 +1112,8 @@ class PROMPTS:
       "🔥 MANDATORY: exampleRows MUST include formulas for calculated values and summary rows. NO hardcoded calculations!"
     )
 
+    system_message: Dict[str, str] = {"role": "system", "content": system}
+
     @staticmethod
     def user(user_prompt: str, constraints: Optional[str] = None) -> str:
       constraints_part = f"\n\n# Constraints\n\n{constraints}" if constraints else ""
@@ -650,13 +1215,20 @@ class PROMPTS:
       "- BE DECISIVE AND PROACTIVE: The user wants fixes applied immediately, not discussions about what to fix."
     )
 
+    system_message: Dict[str, str] = {"role": "system", "content": system}
+
     @staticmethod
     def user(chat_history: str, sheet_context: Optional[str] = None) -> str:
-      prompt = "# Conversation History\n\n" + chat_history
-      if sheet_context:
-        prompt += "\n\n# Current Sheet Context\n\n" + sheet_context
-      prompt += "\n\nRespond with JSON only following the format specified in your system prompt."
-      return prompt
+      # One join instead of repeated += so the (possibly long) history is copied once
+      context_part = ("\n\n# Current Sheet Context\n\n", sheet_context) if sheet_context else ()
+      return "".join(
+        (
+          "# Conversation History\n\n",
+          chat_history,
+          *context_part,
+          "\n\nRespond with JSON only following the format specified in your system prompt.",
+        )
+      )
 
 
 def format_sheet_context(context: Any) -> str:
@@ -666,28 +1238,43 @@ def format_sheet_context(context: Any) -> str:
   if isinstance(context, str):
     return context
 
-  formatted = ""
+  parts: List[str] = []
 
   sheet_meta = context.get("sheetMetadata")
   if sheet_meta:
-    formatted += f"Sheet: {sheet_meta.get('title')}\n"
-    formatted += f"Size: {sheet_meta.get('rowCount')} rows × {sheet_meta.get('columnCount')} columns\n\n"
+    parts.append(f"Sheet: {sheet_meta.get('title')}\n")
+    parts.append(f"Size: {sheet_meta.get('rowCount')} rows × {sheet_meta.get('columnCount')} columns\n\n")
 
   table_regions = context.get("tableRegions") or []
   if table_regions:
-    formatted += "Columns:\n"
-    for col in table_regions[0].get("columns", []):
-      formatted += f"- {col.get('name')} ({col.get('type')})\n"
-    formatted += "\n"
+    parts.append("Columns:\n")
+    parts.extend(f"- {col.get('name')} ({col.get('type')})\n" for col in table_regions[0].get("columns", []))
+    parts.append("\n")
 
   summary = context.get("summary")
   if summary:
-    formatted += "Summary:\n"
-    formatted += f"- Total cells: {summary.get('totalCells')}\n"
-    formatted += f"- Formula cells: {summary.get('formulaCells')}\n"
-    formatted += f"- Error cells: {summary.get('errorCells')}\n\n"
+    parts.append("Summary:\n")
+    parts.append(f"- Total cells: {summary.get('totalCells')}\n")
+    parts.append(f"- Formula cells: {summary.get('formulaCells')}\n")
+    parts.append(f"- Error cells: {summary.get('errorCells')}\n\n")
+
+  return "".join(parts)
 
-  return formatted
+
+def _json_scalar(value: Any) -> str:
+  """
+  Render a cell value exactly as json.dumps would, skipping the encoder for the
+  common plain-ASCII string and int cases.
+  """
+  value_type = type(value)
+  if value_type is str:
+    if value.isascii() and value.isprintable() and '"' not in value and "\\" not in value:
+      return f'"{value}"'
+  elif value_type is int:
+    return str(value)
+  elif value is None:
+    return "null"
+  return json.dumps(value)
 
 
 def format_sample_data(sample_data: Any) -> str:
@@ -698,24 +1285,16 @@ def format_sample_data(sample_data: Any) -> str:
   if not sample_data:
     return "No data"
 
-  formatted = ""
+  lines: List[str] = []
   for idx, row in enumerate(sample_data):
-    # Format each cell: show formula if present, then value
+    # Format each cell: show formula if present ("=SUM(A1:A5) → 100"), then value
     cell_strings = []
     for cell in row:
       cell_dict = cell or {}
       formula = cell_dict.get("formula")
-      value = cell_dict.get("value", "")
-      
-      if formula:
-        # Show formula and its result: "=SUM(A1:A5) → 100"
-        cell_str = f"{formula} → {json.dumps(value)}"
-      else:
-        # Just show the value
-        cell_str = json.dumps(value)
-      
-      cell_strings.append(cell_str)
-    
-    formatted += f"Row {idx + 1}: " + " | ".join(cell_strings) + "\n"
-
-  return formatted
+      value_str = _json_scalar(cell_dict.get("value", ""))
+      cell_strings.append(f"{formula} → {value_str}" if formula else value_str)
+
+    lines.append(f"Row {idx + 1}: " + " | ".join(cell_strings) + "\n")
+
+  return "".join(lines)
@@ -2,11 +2,13 @@ from __future__ import annotations
 
 import datetime as _dt
 import uuid
+from collections import Counter
 from typing import Any, Dict, List
 
 from .context_builder import ContextBuilder
 from .llm import LLMClient, PROMPTS, format_sample_data, format_sheet_context
 from .logging_config import get_logger
+from .utils import column_to_letter
 
 logger = get_logger(__name__)
 
@@ -184,9 +186,9 @@ class MistakeDetector:
         logger.info(f"DEBUG: First element keys: {sample_ranges[0].keys() if isinstance(sample_ranges[0], dict) else 'not a dict'}")
         values = sample_ranges[0].get("values") if isinstance(sample_ranges[0], dict) else []
         logger.info(f"DEBUG: Values type: {type(values)}, length: {len(values) if values else 0}")
-        if values and len(values) > 0:
+        if values:
           logger.info(f"DEBUG: First row type: {type(values[0])}, length: {len(values[0]) if values[0] else 0}")
-          if values[0] and len(values[0]) > 0:
+          if values[0]:
             logger.info(f"DEBUG: First cell: {values[0][0]}")
 
       if sample_ranges:
@@ -206,7 +208,7 @@ class MistakeDetector:
 
       response = self.llm_client.chat_json(
         [
-          {"role": "system", "content": PROMPTS.MISTAKE_DETECTION.system},
+          PROMPTS.MISTAKE_DETECTION.system_message,
           {"role": "user", "content": user_prompt},
         ],
         overrides={"temperature": 0.3},
@@ -286,19 +288,12 @@ class MistakeDetector:
       "suspicious_pattern",
     ]
 
-    by_severity = {s: 0 for s in severities}
-    by_category = {c: 0 for c in categories}
-    auto_fixable_count = 0
-
-    for issue in issues:
-      sev = issue.get("severity")
-      cat = issue.get("category")
-      if sev in by_severity:
-        by_severity[sev] += 1
-      if cat in by_category:
-        by_category[cat] += 1
-      if issue.get("autoFixable"):
-        auto_fixable_count += 1
+    # Count in C via Counter, then project onto the fixed key sets (unknown values are dropped).
+    severity_counts = Counter(issue.get("severity") for issue in issues)
+    category_counts = Counter(issue.get("category") for issue in issues)
+    by_severity = {s: severity_counts[s] for s in severities}
+    by_category = {c: category_counts[c] for c in categories}
+    auto_fixable_count = sum(1 for issue in issues if issue.get("autoFixable"))
 
     return {
       "totalIssues": len(issues),
@@ -429,11 +424,4 @@ class MistakeDetector:
 
     return potential_errors
 
-  @staticmethod
-  def _column_to_letter(column: int) -> str:
-    letter = ""
-    while column > 0:
-      remainder = (column - 1) % 26
-      letter = chr(65 + remainder) + letter
-      column = (column - 1) // 26
-    return letter
+  _column_to_letter = staticmethod(column_to_letter)
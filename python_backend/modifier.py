@@ -54,7 +54,7 @@ class SheetModifier:
           errors.append(f"Failed to execute {action.get('type')}: {exc}")
 
       return {
-        "success": len(errors) == 0,
+        "success": not errors,
         "plan": plan,
         "executedActions": executed_actions,
         "errors": errors or None,
@@ -84,7 +84,7 @@ class SheetModifier:
 
     response = self.llm_client.chat_json(
       [
-        {"role": "system", "content": PROMPTS.MODIFICATION_PLAN.system},
+        PROMPTS.MODIFICATION_PLAN.system_message,
         {"role": "user", "content": llm_prompt},
       ],
       overrides={"temperature": 0.3},
@@ -253,14 +253,8 @@ class SheetModifier:
 
     # Execute batch update via Sheets client
     if batch_data:
-      # Use the sheets client's service to perform batch update
-      self.sheets_client.service.spreadsheets().values().batchUpdate(
-        spreadsheetId=spreadsheet_id,
-        body={
-          "valueInputOption": "USER_ENTERED",  # This handles both formulas and values correctly
-          "data": batch_data,
-        },
-      ).execute()
+      # USER_ENTERED handles both formulas and values correctly
+      self.sheets_client.batch_update(spreadsheet_id, batch_data, value_input_option="USER_ENTERED")
 
   def _execute_add_column(
     self,
@@ -7,14 +7,47 @@ from __future__ import annotations
 import json
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from google.auth.transport.requests import AuthorizedSession
 from google.oauth2 import service_account
 
+from .utils import load_json
+
 logger = logging.getLogger(__name__)
 
+# Emails confirmed on the tester list, so repeat registrations skip the consent-screen GET.
+# Entries expire because testers can also be removed from the Cloud console.
+_REGISTERED_TTL_SECONDS = 300.0
+_REGISTERED_CACHE_MAX = 10_000
+_registered_cache: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+_registered_cache_lock = threading.Lock()
+
+
+def _cached_registration(email: str) -> Optional[Dict[str, Any]]:
+    with _registered_cache_lock:
+        entry = _registered_cache.get(email)
+        if entry is None:
+            return None
+        result, expires_at = entry
+        if expires_at <= time.monotonic():
+            del _registered_cache[email]
+            return None
+        _registered_cache.move_to_end(email)
+        return result
+
+
+def _remember_registration(email: str, result: Dict[str, Any]) -> None:
+    with _registered_cache_lock:
+        _registered_cache[email] = (result, time.monotonic() + _REGISTERED_TTL_SECONDS)
+        _registered_cache.move_to_end(email)
+        while len(_registered_cache) > _REGISTERED_CACHE_MAX:
+            _registered_cache.popitem(last=False)
+
 
 class OAuthConsentManager:
     """
@@ -68,6 +101,15 @@ class OAuthConsentManager:
             logger.error("[OAuthConsentManager] Empty email provided")
             raise ValueError("User email is required to register as a tester.")
 
+        cached = _cached_registration(email)
+        if cached is not None:
+            logger.info(
+                "[OAuthConsentManager] Email recently confirmed as tester, skipping lookup: %s",
+                email,
+                extra={"email": email, "already_registered": True, "cached": True}
+            )
+            return {**cached, "added": False}
+
         logger.info(
             "[OAuthConsentManager] Fetching OAuth consent screen config from: %s",
             self._consent_url,
@@ -118,7 +160,7 @@ class OAuthConsentManager:
             )
             config.raise_for_status()
 
-        data = config.json()
+        data = load_json(config.content)
         current_users = set(data.get("testUsers", []))
 
         logger.info(
@@ -133,11 +175,13 @@ class OAuthConsentManager:
                 email,
                 extra={"email": email, "already_registered": True}
             )
-            return {
+            result = {
                 "email": email,
                 "added": False,
                 "testUsers": sorted(current_users),
             }
+            _remember_registration(email, result)
+            return result
 
         current_users.add(email)
         payload = {"testUsers": sorted(current_users)}
@@ -180,7 +224,7 @@ class OAuthConsentManager:
             )
             patch.raise_for_status()
 
-        updated = patch.json()
+        updated = load_json(patch.content)
         logger.info(
             "[OAuthConsentManager] Successfully added %s to OAuth tester list",
             email,
@@ -191,11 +235,13 @@ class OAuthConsentManager:
             }
         )
 
-        return {
+        result = {
             "email": email,
             "added": True,
             "testUsers": updated.get("testUsers", payload["testUsers"]),
         }
+        _remember_registration(email, result)
+        return result
 
     @property
     def _consent_url(self) -> str:
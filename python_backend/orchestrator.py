@@ -44,13 +44,12 @@ class AgentOrchestrator:
       chat_history = self._format_chat_history(messages)
       ctx_str = self._format_sheet_context(sheet_context)
 
-      system_prompt = PROMPTS.AGENT.system
       user_prompt = PROMPTS.AGENT.user(chat_history, ctx_str)
 
       logger.debug("Calling LLM for chat processing")
       response: Dict[str, Any] = self.llm_client.chat_json(
         [
-          {"role": "system", "content": system_prompt},
+          PROMPTS.AGENT.system_message,
           {"role": "user", "content": user_prompt},
         ],
         overrides={"maxTokens": 3000},
@@ -420,14 +419,17 @@ class AgentOrchestrator:
 
         # Get sheet metadata
         try:
-          spreadsheet = validator.fetch_spreadsheet(spreadsheet_id)
-
-          # Find the sheet
-          sheets = spreadsheet.get("sheets", [])
-          if gid is not None:
-            sheet = next((s for s in sheets if s["properties"].get("sheetId") == int(gid)), None)
-          else:
-            sheet = next((s for s in sheets if s["properties"].get("title") == sheet_title), None)
+          # Find the sheet, re-fetching once in case cached metadata predates it
+          sheet = None
+          for refresh in (False, True):
+            spreadsheet = api._cached_fetch_spreadsheet(validator, spreadsheet_id, refresh=refresh)
+            sheets = spreadsheet.get("sheets", [])
+            if gid is not None:
+              sheet = next((s for s in sheets if s["properties"].get("sheetId") == int(gid)), None)
+            else:
+              sheet = next((s for s in sheets if s["properties"].get("title") == sheet_title), None)
+            if sheet:
+              break
 
           if not sheet:
             raise ValueError(f"Sheet '{sheet_title}' not found")
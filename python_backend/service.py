@@ -85,8 +85,8 @@ class ChatService:
       self.store.set_history(session_id, combined)
 
       if self._logger.enabled:
-        # Persist only newly seen request messages plus this turn's responses
-        self._logger.log_messages(
+        # Persist only newly seen request messages plus this turn's responses, off the response path
+        self._logger.log_messages_in_background(
           session_id,
           list(new_request_messages) + list(response.messages),
           sheet_context=request.sheetContext,
@@ -132,7 +132,7 @@ class ChatService:
 
     if self._logger.enabled:
       # For CLI-style usage we know exactly which messages are new.
-      self._logger.log_messages(
+      self._logger.log_messages_in_background(
         session_id,
         [user_message] + list(response.messages),
         sheet_context=sheet_ctx,
@@ -2,11 +2,19 @@ from __future__ import annotations
 
 import json
 import os
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+from googleapiclient.http import build_http
+
+# Reads and overwrite-style writes are safe to repeat, so they let googleapiclient retry
+# 429/5xx responses with its built-in randomized exponential backoff. Creates and
+# structural edits (addSheet, deleteSheet, generic batchUpdate) are sent exactly once.
+_IDEMPOTENT_RETRIES = 3
 
 
 class ServiceAccountSheetsClient:
@@ -39,6 +47,8 @@ class ServiceAccountSheetsClient:
           scopes=scopes,
         )
         service = build("sheets", "v4", credentials=creds, cache_discovery=False)
+        self._credentials = creds
+        self._local = threading.local()
         self._service = service
         self._sheets = service.spreadsheets()
         return
@@ -84,9 +94,24 @@ class ServiceAccountSheetsClient:
     )
 
     service = build("sheets", "v4", credentials=creds, cache_discovery=False)
+    self._credentials = creds
+    self._local = threading.local()
     self._service = service
     self._sheets = service.spreadsheets()
 
+  def _thread_http(self) -> AuthorizedHttp:
+    """
+    Authorized Http for the calling thread.
+
+    httplib2 connections are not thread-safe, so every request executes on a
+    per-thread Http instead of the one shared by the discovery service.
+    """
+    http = getattr(self._local, "http", None)
+    if http is None:
+      http = AuthorizedHttp(self._credentials, http=build_http())
+      self._local.http = http
+    return http
+
   # --- Metadata ---
 
   def get_spreadsheet_metadata(self, spreadsheet_id: str) -> Dict[str, Any]:
@@ -95,7 +120,7 @@ class ServiceAccountSheetsClient:
         spreadsheetId=spreadsheet_id,
         fields="spreadsheetId,properties,sheets",
       )
-      .execute()
+      .execute(http=self._thread_http(), num_retries=_IDEMPOTENT_RETRIES)
     )
 
     sheets_meta: List[Dict[str, Any]] = []
@@ -196,7 +221,7 @@ class ServiceAccountSheetsClient:
         range=range_a1,
         valueRenderOption="UNFORMATTED_VALUE",
       )
-      .execute()
+      .execute(http=self._thread_http(), num_retries=_IDEMPOTENT_RETRIES)
     )
 
     values = result.get("values", []) or []
@@ -224,7 +249,7 @@ class ServiceAccountSheetsClient:
         ranges=[range_a1],
         fields="sheets(data(rowData(values(formattedValue,effectiveValue,userEnteredValue))))",
       )
-      .execute()
+      .execute(http=self._thread_http(), num_retries=_IDEMPOTENT_RETRIES)
     )
 
     sheet = (result.get("sheets") or [None])[0] or {}
@@ -283,24 +308,40 @@ class ServiceAccountSheetsClient:
         valueInputOption=value_input_option,
         body={"values": values},
       )
-      .execute()
+      .execute(http=self._thread_http(), num_retries=_IDEMPOTENT_RETRIES)
     )
 
   def batch_update(
     self,
     spreadsheet_id: str,
     updates: List[Dict[str, Any]],
+    value_input_option: str = "USER_ENTERED",
   ) -> None:
+    """Write several {range, values} ValueRanges in one values.batchUpdate call."""
     (
       self._sheets.values()
       .batchUpdate(
         spreadsheetId=spreadsheet_id,
         body={
-          "valueInputOption": "USER_ENTERED",
+          "valueInputOption": value_input_option,
           "data": updates,
         },
       )
-      .execute()
+      .execute(http=self._thread_http(), num_retries=_IDEMPOTENT_RETRIES)
+    )
+
+  def batch_update_spreadsheet(
+    self,
+    spreadsheet_id: str,
+    requests: List[Dict[str, Any]],
+  ) -> Dict[str, Any]:
+    """Send several spreadsheets.batchUpdate requests (formatting, sheet edits) in one call."""
+    return (
+      self._sheets.batchUpdate(
+        spreadsheetId=spreadsheet_id,
+        body={"requests": requests},
+      )
+      .execute(http=self._thread_http())
     )
 
   def add_sheet(self, spreadsheet_id: str, title: str) -> int:
@@ -319,7 +360,7 @@ class ServiceAccountSheetsClient:
           ]
         },
       )
-      .execute()
+      .execute(http=self._thread_http())
     )
     replies = result.get("replies") or []
     if not replies:
@@ -340,10 +381,22 @@ class ServiceAccountSheetsClient:
           ]
         },
       )
-      .execute()
+      .execute(http=self._thread_http())
     )
 
   def create_spreadsheet(self, title: str, sheet_titles: Optional[List[str]] = None) -> str:
+    spreadsheet_id, _ = self.create_spreadsheet_with_sheet_ids(title, sheet_titles)
+    return spreadsheet_id
+
+  def create_spreadsheet_with_sheet_ids(
+    self,
+    title: str,
+    sheet_titles: Optional[List[str]] = None,
+  ) -> Tuple[str, Dict[str, int]]:
+    """
+    Create a spreadsheet and return its id plus a {sheet title: sheetId} map
+    read from the create response, so callers don't need a follow-up metadata GET.
+    """
     sheet_titles = sheet_titles or ["Sheet1"]
     result = (
       self._sheets.create(
@@ -352,9 +405,13 @@ class ServiceAccountSheetsClient:
           "sheets": [{"properties": {"title": t}} for t in sheet_titles],
         }
       )
-      .execute()
+      .execute(http=self._thread_http())
     )
-    return result.get("spreadsheetId", "")
+    sheet_ids = {
+      (sheet.get("properties") or {}).get("title", ""): (sheet.get("properties") or {}).get("sheetId", 0)
+      for sheet in result.get("sheets", [])
+    }
+    return result.get("spreadsheetId", ""), sheet_ids
 
   def format_range(
     self,
@@ -387,10 +444,15 @@ class ServiceAccountSheetsClient:
           ]
         },
       )
-      .execute()
+      .execute(http=self._thread_http(), num_retries=_IDEMPOTENT_RETRIES)
     )
 
   @property
   def service(self):
     """Expose the underlying Google Sheets service."""
     return self._service
+
+  @property
+  def credentials(self):
+    """Expose the google-auth credentials the service was built with."""
+    return self._credentials
@@ -20,6 +20,9 @@ logger = get_logger(__name__)
 
 
 _supabase_client: Optional["Client"] = None
+# Set once the integration is known to be unusable (package missing or no
+# credentials) so later calls skip the env lookups and repeated warnings.
+_supabase_unavailable = False
 
 
 def get_supabase_client() -> Optional["Client"]:
@@ -29,16 +32,19 @@ def get_supabase_client() -> Optional["Client"]:
   Configuration is read from environment variables, which are loaded from
   local .env-style files using the same mechanism as the LLM client.
   """
-  global _supabase_client
+  global _supabase_client, _supabase_unavailable
+
+  if _supabase_client is not None:
+    return _supabase_client
+  if _supabase_unavailable:
+    return None
 
   # If supabase package is not installed, return None
   if create_client is None or Client is None:
     logger.warning("Supabase package not installed - client unavailable")
+    _supabase_unavailable = True
     return None
 
-  if _supabase_client is not None:
-    return _supabase_client
-
   # Ensure env vars are populated from local config files if present
   _load_env_from_local_files()
 
@@ -59,6 +65,7 @@ def get_supabase_client() -> Optional["Client"]:
             "has_anon_key": bool(os.getenv("SUPABASE_ANON_KEY")),
         }
     )
+    _supabase_unavailable = True
     return None
 
   try:
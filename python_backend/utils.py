@@ -1,7 +1,17 @@
 from __future__ import annotations
 
+import json
 import re
-from typing import Optional, Dict
+from functools import lru_cache
+from typing import Any, Optional, Dict, Tuple, Union
+
+try:
+  import orjson
+except ImportError:  # pragma: no cover - optional speedup
+  orjson = None  # type: ignore[assignment]
+
+_SPREADSHEET_ID_RE = re.compile(r"/spreadsheets/d/([a-zA-Z0-9-_]+)")
+_GID_RE = re.compile(r"[?&]gid=(\d+)")
 
 
 def parse_spreadsheet_url(raw: str) -> Dict[str, Optional[str]]:
@@ -27,11 +37,11 @@ def parse_spreadsheet_url(raw: str) -> Dict[str, Optional[str]]:
   trimmed = raw.strip()
 
   # Extract spreadsheet ID from URL or use as-is
-  id_match = re.search(r"/spreadsheets/d/([a-zA-Z0-9-_]+)", trimmed)
+  id_match = _SPREADSHEET_ID_RE.search(trimmed)
   spreadsheet_id = id_match.group(1) if id_match else trimmed
 
   # Extract gid if present in URL
-  gid_match = re.search(r"[?&]gid=(\d+)", trimmed)
+  gid_match = _GID_RE.search(trimmed)
   gid = gid_match.group(1) if gid_match else None
 
   return {
@@ -56,7 +66,22 @@ def normalize_spreadsheet_id(raw: str) -> str:
   return parse_spreadsheet_url(raw)["spreadsheet_id"]
 
 
+# Index n holds the letter for 1-based column n; covers A..ZZ so common sheets never loop.
+_COLUMN_LETTERS: Tuple[str, ...] = (
+  ("",)
+  + tuple(chr(65 + first) for first in range(26))
+  + tuple(chr(65 + first) + chr(65 + second) for first in range(26) for second in range(26))
+)
+
+
 def column_to_letter(column: int) -> str:
+  if 0 <= column < len(_COLUMN_LETTERS):
+    return _COLUMN_LETTERS[column]
+  return _wide_column_to_letter(column)
+
+
+@lru_cache(maxsize=4096)
+def _wide_column_to_letter(column: int) -> str:
   letter = ""
   while column > 0:
     remainder = (column - 1) % 26
@@ -65,3 +90,19 @@ def column_to_letter(column: int) -> str:
   return letter
 
 
+def dump_json_bytes(value: Any) -> bytes:
+  """
+  Serialize a value to UTF-8 JSON bytes, using orjson when it is installed.
+  """
+  if orjson is not None:
+    return orjson.dumps(value)
+  return json.dumps(value).encode("utf-8")
+
+
+def load_json(data: Union[bytes, str]) -> Any:
+  """
+  Parse JSON from bytes or str, using orjson when it is installed.
+  """
+  if orjson is not None:
+    return orjson.loads(data)
+  return json.loads(data)
@@ -9,6 +9,7 @@ import uuid
 from typing import Any, Dict, List, Optional, Tuple
 
 from .logging_config import get_logger
+from .utils import column_to_letter
 
 logger = get_logger(__name__)
 
@@ -39,12 +40,7 @@ def _column_label(index: int) -> str:
     """Convert column index to letter (0=A, 25=Z, 26=AA, etc)."""
     if index < 0:
         raise ValueError(f"Column index must be non-negative: {index}")
-    label = ""
-    while index >= 0:
-        index, remainder = divmod(index, 26)
-        label = chr(65 + remainder) + label
-        index -= 1
-    return label
+    return column_to_letter(index + 1)
 
 
 def _cell_address(row_index: int, col_index: int) -> str:
@@ -96,7 +92,8 @@ def visualize_formulas(
     Color-code cells to distinguish formulas (green) from hard-coded values (orange).
 
     Args:
-        validator: GoogleSheetsFormulaValidator instance with .service attribute
+        validator: Sheets helper from api._get_sheets_service(); requests go through
+            api._sheets_request, which is safe to call from worker threads
         spreadsheet_id: The bare spreadsheet ID
         sheet_title: The sheet name
         sheet_id: The sheet ID for API requests
@@ -106,17 +103,24 @@ def visualize_formulas(
     Returns:
         Dict with status, message, count, and snapshot_batch_id
     """
+    # Imported lazily: api pulls in the whole FastAPI app
+    from . import api
+
     logger.info(f"Visualizing formulas on sheet '{sheet_title}' (id={spreadsheet_id})")
 
     # Fetch cell data with formulas
     quoted_title = sheet_title.replace("'", "''")
     try:
-        response = validator.service.spreadsheets().get(
-            spreadsheetId=spreadsheet_id,
-            includeGridData=True,
-            ranges=[f"'{quoted_title}'"],
-            fields="sheets(data(startRow,startColumn,rowData(values(userEnteredValue,userEnteredFormat,effectiveFormat))),properties(sheetId,title))",
-        ).execute()
+        response = api._sheets_request(
+            validator,
+            "GET",
+            spreadsheet_id,
+            params={
+                "includeGridData": "true",
+                "ranges": [f"'{quoted_title}'"],
+                "fields": "sheets(data(startRow,startColumn,rowData(values(userEnteredValue,userEnteredFormat,effectiveFormat))),properties(sheetId,title))",
+            },
+        )
     except Exception as exc:
         logger.error(f"Failed to fetch sheet data: {exc}", exc_info=True)
         raise
@@ -201,10 +205,12 @@ def visualize_formulas(
         )
 
     try:
-        validator.service.spreadsheets().batchUpdate(
-            spreadsheetId=spreadsheet_id,
+        api._sheets_request(
+            validator,
+            "POST",
+            f"{spreadsheet_id}:batchUpdate",
             body={"requests": batch_requests},
-        ).execute()
+        )
         logger.info(f"Applied colors to {len(batch_requests)} cells")
     except Exception as exc:
         logger.error(f"Failed to apply colors: {exc}", exc_info=True)
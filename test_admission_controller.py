@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the AIMD admission controller that bounds in-flight async LLM calls.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add python_backend to path
+sys.path.insert(0, str(Path(__file__).parent / "python_backend"))
+
+from python_backend.llm import _AdmissionController
+
+
+async def _fill_window(controller, duration_ms):
+    for _ in range(controller.window):
+        await controller.acquire()
+        await controller.release(duration_ms)
+
+
+async def _check_admission_controller():
+    controller = _AdmissionController(initial=2.0, maximum=3.0, target_ms=100.0, window=4)
+
+    # Additive increase after a fast window, capped at maximum
+    await _fill_window(controller, 50.0)
+    assert controller.limit == 2.5, controller.limit
+    for _ in range(3):
+        await _fill_window(controller, 50.0)
+    assert controller.limit == 3.0, controller.limit
+    print("✓ Fast windows grow the limit up to maximum")
+
+    # Multiplicative decrease after a slow window
+    await _fill_window(controller, 500.0)
+    assert controller.limit == 1.5, controller.limit
+    print("✓ Slow window halves the limit")
+
+    # Provider pushback halves immediately, floored at minimum
+    for _ in range(3):
+        await controller.acquire()
+        await controller.release(10.0, throttled=True)
+    assert controller.limit == 1.0, controller.limit
+    print("✓ Throttled responses halve down to minimum")
+
+    # Calls without a response free their slot but neither shrink nor count as samples
+    await controller.acquire()
+    await controller.release(None)
+    assert controller.limit == 1.0 and controller._latencies == [], controller._latencies
+    print("✓ Failed calls only release their slot")
+
+    # With limit 1, a second caller waits until the first releases
+    order = []
+
+    async def worker(name, hold):
+        await controller.acquire()
+        order.append(f"{name}+")
+        await asyncio.sleep(hold)
+        order.append(f"{name}-")
+        await controller.release(1.0)
+
+    await asyncio.gather(worker("a", 0.02), worker("b", 0.0))
+    assert order == ["a+", "a-", "b+", "b-"], order
+    print("✓ Callers wait for a free slot")
+
+    # Cancelling a caller mid-request does not shrink the limit
+    controller.limit = 2.0
+
+    async def cancelled_call():
+        await controller.acquire()
+        try:
+            await asyncio.sleep(10)
+        finally:
+            await controller.release(None)
+
+    task = asyncio.create_task(cancelled_call())
+    await asyncio.sleep(0)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert controller.limit == 2.0 and controller._in_flight == 0
+    print("✓ Cancellation releases without shrinking")
+
+
+def test_admission_controller():
+    """Test AIMD grow, shrink and wait behaviour."""
+    print("=" * 80)
+    print("Testing LLM Admission Controller")
+    print("=" * 80)
+    asyncio.run(_check_admission_controller())
+    print("✓ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    test_admission_controller()
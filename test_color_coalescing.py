@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test the rectangle merging used when restoring cell colors.
+"""
+
+import sys
+from collections import Counter
+from pathlib import Path
+
+# Add python_backend to path
+sys.path.insert(0, str(Path(__file__).parent / "python_backend"))
+
+from python_backend.api import _coalesce_color_cells
+
+RED = (1.0, 0.0, 0.0)
+BLUE = (0.0, 0.0, 1.0)
+
+
+def _covered_cells(rects):
+    """Expand rectangles back into a Counter of (row, col, rgb) cells."""
+    cells = Counter()
+    for row, col, row_count, col_count, rgb in rects:
+        for r in range(row, row + row_count):
+            for c in range(col, col + col_count):
+                cells[(r, c, rgb)] += 1
+    return cells
+
+
+def _assert_exact_cover(colors_by_position, rects):
+    cells = _covered_cells(rects)
+    expected = Counter((r, c, rgb) for (r, c), rgb in colors_by_position.items())
+    assert cells == expected, f"cover mismatch: {cells} != {expected}"
+
+
+def test_color_coalescing():
+    """Test merging of same-colored cells into rectangles."""
+
+    test_cases = [
+        (
+            "Horizontal run",
+            {(0, 0): RED, (0, 1): RED, (0, 2): RED},
+            [(0, 0, 1, 3, RED)],
+        ),
+        (
+            "Vertical stacking",
+            {(r, c): RED for r in range(3) for c in range(2)},
+            [(0, 0, 3, 2, RED)],
+        ),
+        (
+            "Color break within a row",
+            {(0, 0): RED, (0, 1): BLUE, (0, 2): BLUE},
+            [(0, 0, 1, 1, RED), (0, 1, 1, 2, BLUE)],
+        ),
+        (
+            "Column gap splits the run",
+            {(0, 0): RED, (0, 2): RED},
+            [(0, 0, 1, 1, RED), (0, 2, 1, 1, RED)],
+        ),
+        (
+            "Row gap stops stacking",
+            {(0, 0): RED, (2, 0): RED},
+            [(0, 0, 1, 1, RED), (2, 0, 1, 1, RED)],
+        ),
+        (
+            "Different widths do not stack",
+            {(0, 0): RED, (0, 1): RED, (1, 0): RED},
+            [(0, 0, 1, 2, RED), (1, 0, 1, 1, RED)],
+        ),
+        (
+            "Stacking resumes per color",
+            {(0, 0): RED, (0, 1): BLUE, (1, 0): RED, (1, 1): BLUE},
+            [(0, 0, 2, 1, RED), (0, 1, 2, 1, BLUE)],
+        ),
+        ("Empty input", {}, []),
+    ]
+
+    print("=" * 80)
+    print("Testing Color Rectangle Coalescing")
+    print("=" * 80)
+
+    for description, colors, expected in test_cases:
+        rects = _coalesce_color_cells(colors)
+        print(f"{description:35s} | {len(colors)} cells -> {len(rects)} rects")
+        assert sorted(rects) == sorted(expected), f"{description}: {rects}"
+        _assert_exact_cover(colors, rects)
+
+    # Irregular checkerboard-ish grid: whatever the shapes, every cell is covered once
+    grid = {
+        (r, c): (RED if (r * 7 + c * 3) % 5 < 3 else BLUE)
+        for r in range(12)
+        for c in range(9)
+        if (r + c) % 11
+    }
+    rects = _coalesce_color_cells(grid)
+    print(f"{'Irregular grid':35s} | {len(grid)} cells -> {len(rects)} rects")
+    _assert_exact_cover(grid, rects)
+    assert len(rects) < len(grid)
+
+    print("✓ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    test_color_coalescing()
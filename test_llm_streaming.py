@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test SSE parsing and error handling in LLMClient.chat_stream.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import httpx
+
+# Add python_backend to path
+sys.path.insert(0, str(Path(__file__).parent / "python_backend"))
+
+from python_backend.llm import LLMClient
+
+
+def _sse(*events):
+    """Build an SSE body; str events are sent verbatim, dicts as data lines."""
+    lines = []
+    for event in events:
+        lines.append(event if isinstance(event, str) else f"data: {json.dumps(event)}")
+        lines.append("")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _delta(content):
+    return {"choices": [{"delta": {"content": content}}]}
+
+
+def _client(*bodies):
+    """LLMClient whose requests are answered with the given SSE bodies in order."""
+    responses = iter(bodies)
+    calls = []
+
+    def handler(request):
+        calls.append(json.loads(request.content))
+        return httpx.Response(200, content=next(responses), headers={"content-type": "text/event-stream"})
+
+    client = LLMClient(api_key="dummy", model="dummy", base_url="http://dummy", base_delay=0.0, jitter=0.0)
+    client._http = httpx.Client(base_url=client.base_url, transport=httpx.MockTransport(handler))
+    return client, calls
+
+
+def test_llm_streaming():
+    """Test delta assembly, comments, [DONE] and in-stream errors."""
+
+    messages = [{"role": "user", "content": "hi"}]
+
+    print("=" * 80)
+    print("Testing LLM SSE Streaming")
+    print("=" * 80)
+
+    # Deltas are joined; keep-alive comments, role-only deltas and post-[DONE] data are ignored
+    client, calls = _client(_sse(
+        ": OPENROUTER PROCESSING",
+        {"choices": [{"delta": {"role": "assistant"}}]},
+        _delta('{"a": '),
+        ": keep-alive",
+        _delta("[1, 2]}"),
+        {"choices": [{"delta": {}, "finish_reason": "stop"}]},
+        "data: [DONE]",
+        _delta("ignored"),
+    ))
+    assert client.chat_stream(messages) == '{"a": [1, 2]}'
+    assert calls[0]["stream"] is True
+    print("✓ Deltas, comments and [DONE]")
+
+    # A retryable error event restarts the stream and discards partial output
+    client, calls = _client(
+        _sse(_delta("partial"), {"error": {"code": 502, "message": "upstream failed"}}),
+        _sse(_delta("[3]"), "data: [DONE]"),
+    )
+    assert client.chat_json(messages, stream=True) == [3]
+    assert len(calls) == 2
+    print("✓ Retryable error event is retried")
+
+    # Malformed events are retried like transport errors
+    client, calls = _client(_sse("data: {not json"), _sse(_delta("ok"), "data: [DONE]"))
+    assert client.chat_stream(messages) == "ok"
+    assert len(calls) == 2
+    print("✓ Malformed event is retried")
+
+    # Non-retryable error codes fail immediately with the provider's message
+    client, calls = _client(_sse({"error": {"code": 400, "message": "bad model"}}))
+    try:
+        client.chat_stream(messages)
+    except RuntimeError as exc:
+        assert "400" in str(exc) and "bad model" in str(exc), str(exc)
+    else:
+        raise AssertionError("expected RuntimeError for a 400 error event")
+    assert len(calls) == 1
+    print("✓ Non-retryable error event raises")
+
+    print("✓ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    test_llm_streaming()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test validation of LLM-generated spreadsheet plans.
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# Add python_backend to path
+sys.path.insert(0, str(Path(__file__).parent / "python_backend"))
+
+from python_backend.creator import SheetCreator
+
+
+def _plan(columns, example_rows=None):
+    sheet = {"name": "Budget", "columns": columns}
+    if example_rows is not None:
+        sheet["exampleRows"] = example_rows
+    return {"title": "Plan", "sheets": [sheet]}
+
+
+def test_plan_validation():
+    """Test SheetCreator._validate_plan on accepted and rejected plans."""
+
+    creator = SheetCreator(sheets_client=MagicMock(), llm_client=MagicMock())
+
+    accepted = [
+        (
+            _plan([{"name": "Item"}, {"name": 2024}, {"name": 2025.5}]),
+            "Numeric column headers",
+        ),
+        (
+            _plan([{"name": "Item", "type": ["text"]}, {"name": "Cost", "type": 3}]),
+            "Non-string column types",
+        ),
+        (
+            _plan([{"name": "Item"}, {"name": "Cost"}], [["Rent", 1200], ["Food", 300]]),
+            "Rows match column count",
+        ),
+        ({"title": 2024, "sheets": [{"name": 1, "columns": [{"name": "A"}]}]}, "Numeric title and sheet name"),
+    ]
+
+    rejected = [
+        (
+            _plan([{"name": "Item"}, {"name": "Cost"}], [["Rent", 1200], ["Food"]]),
+            "exampleRow 2 has 1 values but 2 columns defined",
+            "Short example row",
+        ),
+        (
+            _plan([{"name": "Item"}], [["Rent", 1200, "extra"]]),
+            "exampleRow 1 has 3 values but 1 columns defined",
+            "Long example row",
+        ),
+        (_plan([{"name": ""}]), "columns[1].name", "Empty column name"),
+        (_plan([]), "columns", "No columns"),
+        ({"title": "Plan", "sheets": []}, "sheets", "No sheets"),
+    ]
+
+    print("=" * 80)
+    print("Testing Plan Validation")
+    print("=" * 80)
+
+    for plan, description in accepted:
+        errors = creator._validate_plan(plan)
+        print(f"{description:35s} | errors: {errors}")
+        assert errors == [], f"{description}: {errors}"
+
+    for plan, expected_fragment, description in rejected:
+        errors = creator._validate_plan(plan)
+        print(f"{description:35s} | errors: {errors}")
+        assert errors, f"{description}: expected errors"
+        assert any(expected_fragment in err for err in errors), f"{description}: {errors}"
+
+    print("✓ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    test_plan_validation()
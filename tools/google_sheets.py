@@ -43,6 +43,7 @@ class GoogleSheetsFormulaValidator:
 
     def __init__(self, credentials_path: Path):
         self.credentials_path = Path(credentials_path)
+        self.credentials = None
         self.service = self._build_service()
 
     def _build_service(self):
@@ -83,6 +84,7 @@ class GoogleSheetsFormulaValidator:
                 if token_path:
                     token_path.write_text(credentials.to_json())
 
+        self.credentials = credentials
         return build("sheets", "v4", credentials=credentials)
 
     def fetch_spreadsheet(self, spreadsheet_id: str) -> Dict[str, Any]:
@@ -14,6 +14,11 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None  # type: ignore[assignment]
+
 # * Ensure project root is importable when run from tools directory
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
@@ -167,7 +172,7 @@ def _fetch_snapshot_rows(
         body = exc.read().decode("utf-8", errors="ignore")
         raise RuntimeError(f"Supabase fetch failed: {exc.status} {body}") from exc
 
-    rows = json.loads(payload)
+    rows = orjson.loads(payload) if orjson is not None else json.loads(payload)
     if not isinstance(rows, list):
         raise RuntimeError("Supabase response malformed; expected a list.")
     return rows
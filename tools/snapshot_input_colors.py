@@ -14,6 +14,11 @@ from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None  # type: ignore[assignment]
+
 # * Ensure project root is importable when run from tools directory
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
@@ -196,7 +201,7 @@ def _post_to_supabase(rows: List[Dict[str, Any]]) -> None:
     request = urllib.request.Request(
         url,
         method="POST",
-        data=json.dumps(rows).encode("utf-8"),
+        data=orjson.dumps(rows) if orjson is not None else json.dumps(rows).encode("utf-8"),
         headers={
             "Content-Type": "application/json",
             "apikey": SUPABASE_SERVICE_KEY,
@@ -243,18 +248,21 @@ def main() -> None:
     sheet_props = sheet["properties"]
     sheet_title = sheet_props["title"]
 
+    # * Deterministic batch id per range (re-runs upsert the same rows); hash each once
+    snapshot_batch_ids = {
+        range_ref: str(uuid.uuid5(uuid.NAMESPACE_URL, f"{spreadsheet_id}:{gid}:{range_ref}"))
+        for range_ref in ranges
+    }
+
     rows_to_insert: List[Dict[str, Any]] = []
     for range_ref in ranges:
-        snapshot_batch_id = uuid.uuid5(
-            uuid.NAMESPACE_URL,
-            f"{spreadsheet_id}:{gid}:{range_ref}",
-        )
+        snapshot_batch_id = snapshot_batch_ids[range_ref]
         colors_by_cell = _fetch_colors_for_range(validator, spreadsheet_id, sheet_title, range_ref)
         for cell in _expand_range(range_ref):
             color = colors_by_cell.get(cell, WHITE)
             rows_to_insert.append(
                 {
-                    "snapshot_batch_id": str(snapshot_batch_id),
+                    "snapshot_batch_id": snapshot_batch_id,
                     "spreadsheet_id": spreadsheet_id,
                     "gid": gid,
                     "cell": cell,
@@ -272,12 +280,7 @@ def main() -> None:
     
     # * Print first snapshot batch ID for test_run.py to capture
     if ranges:
-        first_range = ranges[0]
-        first_snapshot_batch_id = uuid.uuid5(
-            uuid.NAMESPACE_URL,
-            f"{spreadsheet_id}:{gid}:{first_range}",
-        )
-        print(f"Snapshot batch ID: {first_snapshot_batch_id}")
+        print(f"Snapshot batch ID: {snapshot_batch_ids[ranges[0]]}")
 
 
 if __name__ == "__main__":
@@ -15,6 +15,11 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None  # type: ignore[assignment]
+
 # * Ensure project root modules are importable when run from tools directory
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
@@ -177,7 +182,7 @@ def _post_snapshot_rows(rows: List[Dict[str, Any]]) -> None:
     request = urllib.request.Request(
         url,
         method="POST",
-        data=json.dumps(rows).encode("utf-8"),
+        data=orjson.dumps(rows) if orjson is not None else json.dumps(rows).encode("utf-8"),
         headers={
             "Content-Type": "application/json",
             "apikey": SUPABASE_SERVICE_KEY,